@@ -1,9 +1,9 @@
 # Import necessary libraries
 import streamlit as st
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 from utils.theme import theme_css
+from utils.penguins import filter_species, load_penguins, species_options
+from utils.metrics import section
+from utils.export import export_controls
 
 st.session_state.setdefault("theme_mode", "auto")
 st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
@@ -12,11 +12,6 @@ st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 st.header("Exploratory Data Analysis")
 
 
-# Step 1: Load the penguins dataset
-penguins = sns.load_dataset("penguins")
-
-# Display the first 5 rows to understand the structure
-
 def summary(filtered_data):
 
     # Summary statistics
@@ -27,22 +22,26 @@ def summary(filtered_data):
     st.write("### Species Distribution")
     st.bar_chart(filtered_data['species'].value_counts())
 
-def load_data():
-    return sns.load_dataset("penguins").dropna()
-
-penguins = load_data()
+# Step 1: Load the penguins dataset (cached, shared loader)
+with section("load"):
+    penguins = load_penguins()
 
 
 
 # Species selection
 species = st.multiselect(
     "Select Species",
-    options=penguins['species'].unique(),
-    default=penguins['species'].unique()
+    options=species_options(penguins),
+    default=species_options(penguins)
 )
 
 # Filter data based on user selection
-filtered_data = penguins[penguins['species'].isin(species)]
-summary(filtered_data)
+with section("filter"):
+    filtered_data = filter_species(penguins, species)
+with section("plot"):
+    summary(filtered_data)
+
+with st.expander("Export filtered data"):
+    export_controls(filtered_data, name="penguins", key="penguins_export")
 
 
@@ -1,25 +1,81 @@
 import pydeck as pdk
 import streamlit as st
-import pandas as pd
 from utils.theme import theme_css
+from utils.geo_bins import LEVELS, LAT0, LON0, MAX_CELLS, crime_pyramid, cells_for_view
+from utils.crime_store import dataset_version
+from utils.metro import station_index
+from utils.raster import VIEW_H, VIEW_W, crime_overlay
+from utils.metrics import section
 
 st.session_state.setdefault("theme_mode", "auto")
 st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 
-df = pd.DataFrame({
-    'lat': [19.43, 20.65, 25.68],
-    'lon': [-99.13, -103.34, -100.31],
-    'value': [100, 70, 85]
-})
+st.header("Crime density map")
+
+mode = st.radio("Rendering", ["Grid cells (3D)", "Every point (raster)"], horizontal=True)
+
+if mode == "Every point (raster)":
+    # Every geolocated crime is binned into the pixels of one screen-sized
+    # viewport and sent as a single image, so the payload depends on the
+    # screen, not on the number of records
+    stations = station_index().stations
+    col1, col2 = st.columns(2)
+    centre = col1.selectbox("Centre on", options=["City centre"] + stations['estacion'].tolist())
+    zoom = col2.slider("Zoom", 9, 16, 11)
+    if centre == "City centre":
+        lat, lon = LAT0, LON0
+    else:
+        where = stations[stations['estacion'] == centre].iloc[0]
+        lat, lon = float(where['latitud']), float(where['longitud'])
+
+    agg = crime_pyramid()["City"]
+    col1, col2 = st.columns(2)
+    years = col1.multiselect("Year", options=sorted(agg['anio_hecho'].dropna().unique().tolist()))
+    categories = col2.multiselect("Crime type", options=sorted(agg['categoria_delito'].dropna().unique().tolist()))
+
+    with section("plot"):
+        image, bounds, drawn = crime_overlay(dataset_version(), lat, lon, zoom,
+                                             tuple(years) or None, tuple(categories) or None)
+    st.caption(f"{drawn:,} crimes in view · one {VIEW_W}×{VIEW_H} px image · pan outside it and re-centre to redraw")
+    # Quoted so pydeck passes the data URL through as a literal, not an accessor
+    layer = pdk.Layer('BitmapLayer', data=None, image=f'"{image}"', bounds=bounds, opacity=0.9)
+    view_state = pdk.ViewState(latitude=lat, longitude=lon, zoom=zoom, pitch=0)
+    st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state))
+    st.stop()
+
+# Cells are pre-aggregated per detail level; only the selected level's
+# filtered cells are sent to the browser, never the raw rows
+with section("load"):
+    pyramid = crime_pyramid()
+level = st.select_slider("Detail level", options=list(LEVELS), value="Alcaldía")
+cell_m, zoom = LEVELS[level]
+agg = pyramid[level]
+
+col1, col2 = st.columns(2)
+years = col1.multiselect("Year", options=sorted(agg['anio_hecho'].dropna().unique().tolist()))
+categories = col2.multiselect("Crime type", options=sorted(agg['categoria_delito'].dropna().unique().tolist()))
+
+with section("filter"):
+    df = cells_for_view(agg, cell_m, years=years or None, categories=categories or None)
+st.caption(f"{len(df):,} cells of {cell_m} m · {int(df['n'].sum()):,} crimes")
+if len(df) >= MAX_CELLS:
+    st.info(f"Showing the {MAX_CELLS:,} densest cells; pick a coarser level or narrow the filters to see all.")
+
+max_n = max(int(df['n'].max()), 1) if len(df) else 1
+df['alpha'] = (60 + 195 * df['n'] / max_n).astype(int)
 
 layer = pdk.Layer(
-    'ScatterplotLayer',
+    'GridCellLayer',
     data=df,
     get_position='[lon, lat]',
-    get_color='[200, 30, 0, 160]',
-    get_radius=50000,
+    cell_size=cell_m,
+    get_fill_color='[200, 30, 0, alpha]',
+    get_elevation='n',
+    elevation_scale=cell_m / max_n * 4,
+    extruded=True,
+    pickable=True,
 )
 
-view_state = pdk.ViewState(latitude=23, longitude=-102, zoom=4)
+view_state = pdk.ViewState(latitude=LAT0, longitude=LON0, zoom=zoom, pitch=40)
 
-st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state))
+st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view_state, tooltip={"text": "{n} crimes"}))
@@ -1,20 +1,60 @@
 import plotly.express as px
 import streamlit as st
-import pandas as pd
 from utils.theme import theme_css
+from utils.metro import nearest_stations, station_index
+from utils.crime_store import dataset_version
+from utils.geo_bins import LAT0, LON0
+from utils.raster import VIEW_H, VIEW_W, crime_overlay
+from utils.metrics import section
 
 st.session_state.setdefault("theme_mode", "auto")
 st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 
-df = pd.DataFrame({
-    'city': ['CDMX', 'GDL', 'MTY'],
-    'lat': [19.43, 20.65, 25.68],
-    'lon': [-99.13, -103.34, -100.31],
-    'value': [10, 20, 15]
-})
+st.header("Crimes around Metro stations")
+radius = st.slider("Radius around each station (m)", 100, 2000, 500, step=100)
 
-fig = px.scatter_mapbox(
-    df, lat='lat', lon='lon', size='value', hover_name='city',
-    color='value', zoom=4, mapbox_style='carto-positron'
+# Nearest station per crime is precomputed once and shared
+with section("load"):
+    near = near_all = nearest_stations()
+with section("filter"):
+    near = near[near['distancia_estacion_m'] <= radius]
+    counts = near['estacion_cercana'].value_counts()
+
+stations = station_index().stations
+col1, col2 = st.columns(2)
+centre = col1.selectbox("Centre on", options=["City centre"] + stations['estacion'].tolist())
+zoom = col2.slider("Zoom", 9, 16, 10)
+if centre == "City centre":
+    lat, lon = LAT0, LON0
+else:
+    where = stations[stations['estacion'] == centre].iloc[0]
+    lat, lon = float(where['latitud']), float(where['longitud'])
+
+df = stations.assign(crimes=stations['estacion'].map(counts).fillna(0).astype(int))
+df['size'] = df['crimes'].clip(lower=1)
+
+st.caption(f"{len(near):,} of {near_all['estacion_cercana'].notna().sum():,} geolocated crimes "
+           f"are within {radius} m of a station.")
+
+fig = px.scatter_map(
+    df, lat='latitud', lon='longitud', size='size', hover_name='estacion',
+    hover_data={'lineas': True, 'crimes': True, 'size': False},
+    color='crimes', zoom=zoom, center={'lat': lat, 'lon': lon}, map_style='carto-positron'
 )
+if st.checkbox("Show every crime as a density underlay"):
+    # All crime locations binned server-side into one screen-sized image of
+    # the chosen view; panning or zooming the chart only stretches it
+    with section("plot"):
+        image, (west, south, east, north), drawn = crime_overlay(dataset_version(), lat, lon, zoom)
+    st.caption(f"{drawn:,} crimes in the underlay · one {VIEW_W}×{VIEW_H} px image · "
+               "use Centre on / Zoom above to redraw it for another view")
+    fig.update_layout(map_layers=[{
+        'sourcetype': 'image', 'source': image, 'below': 'traces',
+        'coordinates': [[west, north], [east, north], [east, south], [west, south]],
+    }])
 st.plotly_chart(fig)
+
+st.dataframe(
+    df.sort_values('crimes', ascending=False)[['estacion', 'lineas', 'crimes']].head(20),
+    width='stretch', hide_index=True,
+)
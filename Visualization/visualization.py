@@ -1,63 +1,98 @@
 import streamlit as st
-import sys
-import os
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 from utils.theme import theme_css
+from utils.cube import crime_cube
+from utils.crime_store import shared_crimes
+from utils.facets import crime_facets
+from utils.penguins import filter_species, load_penguins, numeric_columns, penguins_version, species_options
+from utils.figures import boxplot_png, histogram_png, pairplot_png, show
+from utils.metrics import section
+from utils.export import export_controls
 
 st.session_state.setdefault("theme_mode", "auto")
 st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 
 
-# Get the absolute path of the `module1` directory
-eda_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../EDA"))
-# Add it to sys.path
-sys.path.append(eda_path)
-
-# Now, you can import `eda.py`
-import eda
+with section("load"):
+    penguins = load_penguins()
 
 # Speciesselection
 species = st.multiselect(
     "Select Species",
-    options=eda.penguins['species'].unique()
+    options=species_options(penguins)
     
 )
 
 
 # Filter data based on user selection
-eda.filtered_data = eda.penguins[eda.penguins['species'].isin(species)]
+with section("filter"):
+    filtered_data = filter_species(penguins, species)
 
 
 # Display data distribution for selected numeric columns
 st.write("### Data Distribution")
-eda.selected_numeric = st.selectbox("Select Numeric Column", options=eda.penguins.select_dtypes(include=['float64']).columns)
-
-# Create a histogram for the selected numeric column
-plt.figure(figsize=(10, 5))
-sns.histplot(eda.filtered_data[eda.selected_numeric], bins=20, kde=True)
-plt.title(f'Distribution of {eda.selected_numeric}')
-plt.xlabel(eda.selected_numeric)
-plt.ylabel('Frequency')
-st.pyplot(plt)
-
-# Boxplot to compare distributions across species
-st.write("### Boxplot for Selected Numeric Column by Species")
-plt.figure(figsize=(10, 5))
-sns.boxplot(data=eda.filtered_data, x='species', y=eda.selected_numeric)
-plt.title(f'Boxplot of {eda.selected_numeric} by Species')
-plt.xlabel('Species')
-plt.ylabel(eda.selected_numeric)
-st.pyplot(plt)
-
-# Pairplot option
-st.write("### Pairplot")
-if st.sidebar.checkbox("Show Pairplot"):
-    st.write("**Pairplot of Selected Species**")
-    pairplot_data = eda.filtered_data.dropna()  # Drop NaN values for plotting
-    sns.pairplot(pairplot_data, hue="species")
-    st.pyplot(plt)
+selected_numeric = st.selectbox("Select Numeric Column", options=numeric_columns(penguins))
+
+# Figures are rendered once per data version + selection + column + theme
+# and reused as PNG bytes on later reruns
+version = penguins_version()
+selection = tuple(sorted(species))
+theme = st.session_state["theme_mode"]
+
+with section("plot"):
+    # Create a histogram for the selected numeric column
+    show(histogram_png(version, selection, selected_numeric, theme, filtered_data))
+
+    # Boxplot to compare distributions across species
+    st.write("### Boxplot for Selected Numeric Column by Species")
+    show(boxplot_png(version, selection, selected_numeric, "species", theme, filtered_data))
+
+    # Pairplot option
+    st.write("### Pairplot")
+    if st.sidebar.checkbox("Show Pairplot"):
+        st.write("**Pairplot of Selected Species**")
+        # One seaborn call that cannot be interrupted, so it is not a pool job
+        # (an abandoned one would hold a worker); the cache shares it across sessions
+        show(pairplot_png(version, selection, "species", theme, filtered_data))
+
+
+# Crime overview: filters with live per-value counts from the facet index,
+# charts answered from the precomputed aggregate cube
+st.write("### Crime Overview (FGJ)")
+with section("load"):
+    cube = crime_cube()
+    facets = crime_facets()
+CRIME_FILTERS = {"anio_hecho": "Year", "alcaldia_hecho": "Alcaldía",
+                 "categoria_delito": "Crime category", "delito": "Delito"}
+crime_filters = {c: st.session_state.get(f"crime_{c}") or None for c in CRIME_FILTERS}
+with section("filter"):
+    facet_counts = facets.counts(crime_filters, CRIME_FILTERS)
+cols = st.columns(2)
+for i, (col, label) in enumerate(CRIME_FILTERS.items()):
+    # Option labels stay fixed (changing them would reset the widget); the
+    # counts under the other filters go in a caption
+    cols[i % 2].multiselect(label, options=sorted(facets.values[col].tolist()), key=f"crime_{col}")
+    top = facet_counts[col].head(3)
+    cols[i % 2].caption(" · ".join(f"{v}: {n:,}" for v, n in top[top > 0].items()) or "No matching rows")
+
+with section("filter"):
+    by_alcaldia = cube.query(crime_filters, ["alcaldia_hecho"])
+    by_hour = cube.query(crime_filters, ["hora"], sort=False).sort_values("hora")
+m1, m2 = st.columns(2)
+m1.metric("Crimes", f"{int(by_alcaldia['n'].sum()):,}")
+m2.metric("Top alcaldía", str(by_alcaldia['alcaldia_hecho'].iloc[0]) if len(by_alcaldia) else "—")
+st.bar_chart(by_alcaldia.set_index("alcaldia_hecho")["n"])
+
+st.write("Crimes by hour of day")
+st.bar_chart(by_hour.set_index("hora")["n"])
+
+with st.expander("Matching carpetas"):
+    rows = facets.rows(crime_filters)
+    shown = ["fecha_hecho", "delito", "categoria_delito", "alcaldia_hecho", "colonia_hecho"]
+    st.caption(f"{facets.count(crime_filters):,} rows; the first 1,000 are shown.")
+    st.dataframe(facets.take(shared_crimes(), rows, shown, limit=1000), width='stretch', hide_index=True)
+    # The whole selection, streamed to a file in chunks when downloaded
+    export_controls(shared_crimes(), rows, default_columns=shown, name="carpetas", key="crime_export")
 
 
 # Add footer
@@ -0,0 +1,77 @@
+import streamlit as st
+import pandas as pd
+from utils.theme import theme_css
+from utils.metrics import get_store
+
+st.session_state.setdefault("theme_mode", "auto")
+st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
+
+# Navigation only lists this page for Thales, but guard direct URLs too
+if st.session_state.get("role") != "I am from Thales":
+    st.error("This page is only available to the Thales team.")
+    st.stop()
+
+st.header("📈 Performance metrics")
+st.caption("One record per page rerun: section wall times, cache hits/misses, bytes sent to the browser, process RSS.")
+
+store = get_store()
+records = store.snapshot()
+if not records:
+    st.info("No reruns recorded yet. Use the other pages and come back.")
+    st.stop()
+
+runs = pd.DataFrame({
+    "ts": [r["ts"] for r in records],
+    "page": [r["page"] for r in records],
+    "total_ms": [1000 * r["total_s"] for r in records],
+    "kb_sent": [r["bytes_sent"] / 1024 if r["bytes_sent"] is not None else None for r in records],
+    "rss_mb": [r["rss_mb"] for r in records],
+    "cache_hits": [sum(r["cache_hits"].values()) for r in records],
+    "cache_misses": [sum(r["cache_misses"].values()) for r in records],
+})
+sections = pd.DataFrame([{"page": r["page"], **{k: 1000 * v for k, v in r["sections"].items()}} for r in records])
+
+def kb_text(values: pd.Series) -> pd.Series:
+    # Unmeasured when Streamlit offers no message queue to hook (see utils.metrics)
+    return values.map(lambda v: "n/a" if pd.isna(v) else f"{v:,.1f}")
+
+pages = st.multiselect("Pages", options=sorted(runs["page"].unique()))
+if pages:
+    keep = runs["page"].isin(pages).to_numpy()
+    runs, sections = runs[keep], sections[keep]
+
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Reruns", f"{len(runs):,}")
+m2.metric("Median rerun", f"{runs['total_ms'].median():,.0f} ms")
+m3.metric("p95 rerun", f"{runs['total_ms'].quantile(0.95):,.0f} ms")
+m4.metric("RSS now", f"{records[-1]['rss_mb']:,.0f} MB")
+
+st.write("### Per page")
+per_page = runs.groupby("page").agg(
+    reruns=("total_ms", "size"),
+    median_ms=("total_ms", "median"),
+    p95_ms=("total_ms", lambda s: s.quantile(0.95)),
+    median_kb_sent=("kb_sent", "median"),
+    cache_hits=("cache_hits", "sum"),
+    cache_misses=("cache_misses", "sum"),
+).sort_values("p95_ms", ascending=False)
+st.dataframe(per_page.round(1).assign(median_kb_sent=kb_text(per_page["median_kb_sent"])), width='stretch')
+
+st.write("### Median section time (ms)")
+if sections.shape[1] > 1:
+    st.dataframe(sections.groupby("page").median().round(1), width='stretch')
+else:
+    st.caption("No named sections recorded for these pages.")
+
+st.write("### Rerun time and memory")
+st.line_chart(runs.reset_index(drop=True)[["total_ms", "rss_mb"]])
+
+st.write("### Latest reruns")
+latest = runs.iloc[::-1].head(100).round(1)
+st.dataframe(latest.assign(kb_sent=kb_text(latest["kb_sent"])), width='stretch', hide_index=True)
+
+col1, col2 = st.columns(2)
+col1.download_button("Export JSON lines", store.to_jsonl(), file_name="reruns.jsonl", mime="application/jsonl")
+if col2.button("Clear in-memory metrics"):
+    store.clear()
+    st.rerun()
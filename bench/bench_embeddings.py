@@ -0,0 +1,124 @@
+"""
+Embedding store check and benchmark against the stub Ollama server
+(`bench/ollama_stub.py`): batched build, resume after an interrupted run,
+memory-mapped reopen, and query-time top-k latency.
+
+    python -m bench.bench_embeddings --sizes 100000 1000000
+
+Rows are synthesised like `bench_retrieval`, plus a few catalogue labels
+the sample lacks (metro robberies), so a paraphrased question ("assaults
+near the subway") has rows to find. The same question is ranked lexically
+for comparison. The stub maps such words through a fixed thesaurus
+(`SYNONYMS`), so that comparison only checks the plumbing, not how well a
+real embedding model handles paraphrases.
+"""
+import argparse
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from bench.bench_retrieval import synth_texts
+from bench.ollama_stub import embed_text, serve
+from ollama.client import OllamaClient
+from ollama.embeddings import EmbeddingStore
+from ollama.retriever import HashedTfidfIndex
+
+MODEL = "stub-embed"
+EXTRA_LABELS = [
+    "ROBO A PASAJERO A BORDO DEL METRO CON VIOLENCIA | ROBO A TRANSEUNTE CON VIOLENCIA | CUAUHTEMOC",
+    "ROBO A PASAJERO A BORDO DEL METRO SIN VIOLENCIA | DELITO DE BAJO IMPACTO | GUSTAVO A. MADERO",
+    "ROBO A TRANSEUNTE EN VIA PUBLICA CON VIOLENCIA | ROBO A TRANSEUNTE CON VIOLENCIA | IZTAPALAPA",
+]
+PARAPHRASE = "assaults near the subway"
+QUERIES = [PARAPHRASE, "car theft at night", "robbery of a shop without violence", "murder"]
+
+
+class CountingClient(OllamaClient):
+    """Client that records the batch sizes it sends."""
+
+    def __init__(self, base_url: str):
+        super().__init__(base_url)
+        self.batches = []
+
+    def embed(self, model: str, texts) -> list:
+        self.batches.append(len(texts))
+        return super().embed(model, texts)
+
+
+class _Stop(Exception):
+    pass
+
+
+def bench(n: int, k: int, batch: int, url: str) -> dict:
+    texts = synth_texts(n) + EXTRA_LABELS
+    res = {"rows": len(texts)}
+    path = tempfile.mkdtemp(prefix="emb_")
+    try:
+        t = time.perf_counter()
+        store = EmbeddingStore.prepare(path, np.array(texts, dtype=object), MODEL, "bench")
+        res["distinct_texts"] = len(store.texts)
+        res["prepare_s"] = round(time.perf_counter() - t, 2)
+
+        # Interrupted run: stop after about half of the batches
+        client = CountingClient(url)
+        half = len(store.texts) // 2
+
+        def stop_halfway(fraction, message):
+            if store.done >= half:
+                raise _Stop
+
+        t = time.perf_counter()
+        try:
+            store.embed_pending(client, batch=batch, progress=stop_halfway)
+        except _Stop:
+            pass
+        stopped_at = store.done
+
+        # Resume from disk, as a new process would
+        store = EmbeddingStore(path)
+        resumed = store.embed_pending(client, batch=batch)
+        res["embed_s"] = round(time.perf_counter() - t, 2)
+        res["requests"] = len(client.batches)
+        res["resumed_from"] = stopped_at
+        res["resume_ok"] = bool(stopped_at + resumed == len(store.texts) == sum(client.batches)
+                                and max(client.batches) <= batch)
+
+        store = EmbeddingStore(path)
+        sample = np.linspace(0, len(store.texts) - 1, 50).astype(int)
+        expected = np.array([embed_text(store.texts[i]) for i in sample], dtype=np.float32)
+        res["vectors_match"] = bool(np.allclose(store.vectors[sample].astype(np.float32), expected, atol=2e-3))
+        res["matrix_mb"] = round(store.vectors.nbytes / 1e6, 1)
+
+        def semantic(q):
+            return store.search(store.embed_query(client, q), k)
+
+        times = []
+        for q in QUERIES:
+            t = time.perf_counter()
+            semantic(q)
+            times.append(time.perf_counter() - t)
+        res["semantic_query_ms"] = round(1000 * float(np.median(times)), 2)
+
+        def hit_rate(idxs):
+            # Share of the two metro robbery rows among the top two
+            return sum("ROBO" in texts[i] and "METRO" in texts[i] for i in idxs[:2]) / 2
+
+        res["paraphrase_hits_semantic"] = hit_rate(semantic(PARAPHRASE)[0])
+        index = HashedTfidfIndex().append(texts)
+        res["paraphrase_hits_lexical"] = hit_rate(index.search(PARAPHRASE, k)[0])
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+    return res
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=256)
+    args = parser.parse_args()
+    with serve() as url:
+        for n in args.sizes:
+            print(bench(n, args.k, args.batch, url), flush=True)
@@ -0,0 +1,197 @@
+"""
+Headless page benchmark: every page is run through Streamlit's AppTest
+against a synthetic FGJ extract, with Ollama replaced by the local stub.
+
+    python -m bench.bench_pages --rows 10000 1000000
+    python -m bench.bench_pages --rows 10000000 --pages ollama/chatview.py --warm 10
+
+For each size, the extract is generated if missing (`bench.synth_fgj`).
+A preparation step then ingests it and builds the on-disk artefacts (the
+warm-up tasks, each timed). Each page then runs in a fresh interpreter:
+
+- cold: first run in a new process (imports, in-memory caches), with the
+  on-disk artefacts already built;
+- warm: median / p95 of `--warm` further reruns in the same session;
+- chat: latency of a first and a repeated question (chat page only);
+- peak RSS of the page's process.
+
+Results are appended as JSON lines tagged with the git commit, and each row
+is compared with the latest run of another commit.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+PAGES = [
+    "EDA/eda.py",
+    "ml/ml_analysis.py",
+    "Visualization/visualization.py",
+    "Visualization/maps.py",
+    "Visualization/maps2.py",
+    "ollama/chatview.py",
+]
+SIZES = [10_000, 1_000_000, 10_000_000]
+RESULTS = "data/derived/bench/pages.jsonl"
+QUESTION = "robo a transeunte con violencia en cuauhtemoc"
+TIMEOUT = 1800
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ---------- Worker side (one page, fresh process) ----------
+def run_page(page: str, warm: int, question: str = QUESTION) -> dict:
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=TIMEOUT)
+    at.session_state["role"] = "I am from Thales"
+    start = time.perf_counter()
+    at.run()
+    out = {"cold_s": time.perf_counter() - start}
+    errors = [e.message for e in at.exception]
+
+    times = []
+    for _ in range(warm if not errors else 0):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    if times:
+        out["warm_median_s"] = float(np.median(times))
+        out["warm_p95_s"] = float(np.percentile(times, 95))
+
+    if page.endswith("chatview.py") and not errors:
+        for label in ("chat_first_s", "chat_repeat_s"):
+            start = time.perf_counter()
+            at.chat_input[0].set_value(question).run()
+            out[label] = time.perf_counter() - start
+    errors += [e.message for e in at.exception if e.message not in errors]
+    out["errors"] = errors
+    out["peak_rss_mb"] = _peak_rss_mb()
+    return out
+
+
+def prepare() -> dict:
+    """Ingests the extract and builds the shared artefacts; seconds per step."""
+    from utils.warmup import TASKS
+    steps = {}
+    for name, task in TASKS:
+        start = time.perf_counter()
+        try:
+            task()
+            steps[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            steps[name] = f"failed: {e}"
+    steps["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    return steps
+
+
+# ---------- Driver side ----------
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _worker(args, env) -> dict:
+    proc = subprocess.run([sys.executable, "-m", "bench.bench_pages", *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=TIMEOUT)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode or not lines:
+        return {"errors": [f"worker exited {proc.returncode}: {proc.stderr.strip().splitlines()[-1:]}"]}
+    return json.loads(lines[-1])
+
+
+def _previous(path: str, commit: str) -> dict:
+    """Latest result per (rows, page) from another commit."""
+    prev = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                r = json.loads(line)
+                if r.get("commit") != commit:
+                    prev[(r["rows"], r["page"])] = r
+    return prev
+
+
+def _fmt(v, unit="s"):
+    if v is None:
+        return "—"
+    return f"{v * 1000:,.0f} ms" if unit == "s" else f"{v:,.0f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless page benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES[:2])
+    parser.add_argument("--pages", nargs="+", default=PAGES)
+    parser.add_argument("--warm", type=int, default=5, help="warm reruns per page")
+    parser.add_argument("--out", default=RESULTS)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.prepare:
+        print(json.dumps(prepare()))
+        return
+    if args.worker:
+        print(json.dumps(run_page(args.worker, args.warm)))
+        return
+
+    from bench.ollama_stub import serve
+    from bench.synth_fgj import OUT_DIR, generate
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    meta = {"commit": commit, "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+            "python": platform.python_version(), "cpus": os.cpu_count(), "machine": platform.machine()}
+    try:
+        import streamlit
+        meta["streamlit"] = streamlit.__version__
+    except ImportError:
+        pass
+    previous = _previous(args.out, commit)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+
+    with serve() as ollama_url:
+        for rows in args.rows:
+            csv_path = os.path.join(OUT_DIR, f"carpetasFGJ_{rows}.csv")
+            if not os.path.exists(csv_path):
+                print(f"Generating {rows:,} rows…", flush=True)
+                generate(rows, csv_path)
+            env = dict(os.environ, FGJ_CSV=csv_path, FGJ_PARQUET_DIR=os.path.join(OUT_DIR, f"parquet_{rows}"),
+                       OLLAMA_HOST=ollama_url, APP_WARMUP="0", APP_METRICS_LOG="",
+                       PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+            steps = _worker(["--prepare"], env)
+            print(f"\n{rows:,} rows · prepare: " + ", ".join(f"{k} {v}" for k, v in steps.items()), flush=True)
+
+            print(f"{'page':<34}{'cold':>10}{'warm p50':>10}{'warm p95':>10}{'chat 1st':>10}{'chat rep':>10}"
+                  f"{'peak RSS':>10}   vs {'previous' if previous else '—'}")
+            for page in args.pages:
+                res = _worker(["--worker", page, "--warm", str(args.warm)], env)
+                record = {**meta, "when": time.strftime("%Y-%m-%d %H:%M:%S"), "rows": rows, "page": page,
+                          "prepare": steps, **res}
+                with open(args.out, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+                old = previous.get((rows, page))
+                delta = ""
+                if old and old.get("warm_median_s") and res.get("warm_median_s"):
+                    delta = f"{old['commit']}: warm {res['warm_median_s'] / old['warm_median_s'] - 1:+.0%}"
+                print(f"{page:<34}{_fmt(res.get('cold_s')):>10}{_fmt(res.get('warm_median_s')):>10}"
+                      f"{_fmt(res.get('warm_p95_s')):>10}{_fmt(res.get('chat_first_s')):>10}"
+                      f"{_fmt(res.get('chat_repeat_s')):>10}{_fmt(res.get('peak_rss_mb'), 'MB'):>10}   {delta}",
+                      flush=True)
+                for err in res.get("errors", []):
+                    print(f"    error: {str(err).splitlines()[0][:120]}")
+    print(f"\nResults appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
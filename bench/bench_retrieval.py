@@ -0,0 +1,86 @@
+"""
+Retrieval benchmark: the original chat path (TfidfVectorizer +
+cosine_similarity + full argsort) against the inverted-index top-k search of
+`HashedTfidfIndex`.
+
+    python -m bench.bench_retrieval --sizes 10000 1000000 5000000
+
+Rows are synthesised by sampling column values of the FGJ sample, so term
+statistics resemble the real data. Index build times are reported
+separately from per-query latency.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from ollama.retriever import HashedTfidfIndex, row_text
+from utils.crime_store import load_crimes
+
+TEXT_COLS = ["delito", "categoria_delito", "colonia_hecho", "alcaldia_hecho"]
+QUERIES = [
+    "robo a negocio sin violencia en cuauhtemoc",
+    "homicidio",
+    "robo a transeunte en via publica con violencia iztapalapa",
+    "fraude",
+    "lesiones culposas por transito vehicular",
+]
+
+
+def synth_texts(n: int, seed: int = 0) -> list:
+    sample = load_crimes(columns=TEXT_COLS)
+    rng = np.random.default_rng(seed)
+    cols = {c: sample[c].astype("string").fillna("").to_numpy(dtype=object) for c in TEXT_COLS}
+    picked = {c: v[rng.integers(0, len(v), n)] for c, v in cols.items()}
+    return row_text(pd.DataFrame(picked), TEXT_COLS).tolist()
+
+
+def _time(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t)
+    return best, out
+
+
+def bench(n: int, k: int, repeat: int, baseline: bool) -> dict:
+    texts = synth_texts(n)
+    res = {"rows": n}
+
+    t = time.perf_counter()
+    index = HashedTfidfIndex().append(texts)
+    _ = index.doc_norms, index.postings
+    res["index_build_s"] = round(time.perf_counter() - t, 2)
+    res["index_query_ms"] = round(1000 * float(np.mean([_time(lambda: index.search(q, k), repeat)[0] for q in QUERIES])), 2)
+
+    if baseline:
+        t = time.perf_counter()
+        vec = TfidfVectorizer(strip_accents="unicode", ngram_range=(1, 2), min_df=1)
+        X = vec.fit_transform(texts)
+        res["baseline_build_s"] = round(time.perf_counter() - t, 2)
+
+        def dense(q):
+            sims = cosine_similarity(vec.transform([q]), X).ravel()
+            idx = np.argsort(-sims)[:k]
+            return idx, sims[idx]
+
+        res["baseline_query_ms"] = round(1000 * float(np.mean([_time(lambda: dense(q), repeat)[0] for q in QUERIES])), 2)
+        agree = [np.allclose(np.sort(dense(q)[1]), np.sort(index.search(q, k)[1]), atol=1e-5) for q in QUERIES]
+        res["same_top_scores"] = bool(all(agree))
+        res["speedup"] = round(res["baseline_query_ms"] / max(res["index_query_ms"], 1e-9), 1)
+    return res
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 5_000_000])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-baseline", action="store_true", help="skip the TfidfVectorizer path (memory hungry at 5M)")
+    args = parser.parse_args()
+    for n in args.sizes:
+        print(bench(n, args.k, args.repeat, not args.no_baseline), flush=True)
@@ -0,0 +1,72 @@
+"""
+Cold import time of the heavy libraries and of every project module, each
+measured in a fresh interpreter with `python -X importtime`.
+
+    python -m bench.import_times
+    python -m bench.import_times --save bench/import_baseline.json
+    python -m bench.import_times --compare bench/import_baseline.json
+
+With `--compare`, modules that got slower than the baseline by more than
+`--tolerance` (and at least 50 ms) are flagged and the exit status is 1.
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+from utils.warmup import HEAVY_MODULES
+
+PROJECT_MODULES = [
+    "utils.theme", "utils.crime_store", "utils.metro", "utils.geo_bins", "utils.raster",
+    "utils.penguins", "utils.figures", "utils.cube", "utils.warmup",
+    "ollama.retriever", "ollama.structured", "ollama.client", "ollama.llm_cache", "ollama.context",
+    "ml.registry", "ml.crime_model", "ml.tuning",
+]
+BASELINE_MODULES = ["streamlit", "pandas", "numpy", "pyarrow.dataset"]
+MIN_REGRESSION_MS = 50.0
+
+
+def import_ms(module: str, python: str = sys.executable) -> float:
+    """Cumulative import time of `module` in a new process, in milliseconds."""
+    out = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                         capture_output=True, text=True, check=True)
+    # Last line is the top-level module: "import time: self | cumulative | name"
+    last = [line for line in out.stderr.splitlines() if line.startswith("import time:")][-1]
+    return int(last.split("|")[1]) / 1000.0
+
+
+def report(modules, repeat: int = 1) -> dict:
+    """Best-of-`repeat` import time per module."""
+    return {m: min(import_ms(m) for _ in range(repeat)) for m in modules}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold import times")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--save", help="write the timings to this JSON file")
+    parser.add_argument("--compare", help="JSON file from --save to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="allowed relative slowdown")
+    args = parser.parse_args()
+
+    times = report(BASELINE_MODULES + HEAVY_MODULES + PROJECT_MODULES, args.repeat)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = []
+    print(f"{'module':<34}{'ms':>9}{'baseline':>10}")
+    for m, ms in sorted(times.items(), key=lambda kv: -kv[1]):
+        old = baseline.get(m)
+        flag = ""
+        if old is not None and ms > old * (1 + args.tolerance) and ms - old > MIN_REGRESSION_MS:
+            regressions.append(m)
+            flag = "  <-- slower"
+        print(f"{m:<34}{ms:>9.0f}{'' if old is None else f'{old:>10.0f}'}{flag}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(times, f, indent=1, sort_keys=True)
+    if regressions:
+        print(f"{len(regressions)} import-time regression(s): {', '.join(regressions)}")
+        sys.exit(1)
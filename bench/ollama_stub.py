@@ -0,0 +1,165 @@
+"""
+Minimal stand-in for a local Ollama server, for benchmarks and manual
+checks without a model:
+
+    python -m bench.ollama_stub --port 11434 --delay 0.01
+
+`/api/generate` streams a canned answer as JSON lines, one word per chunk.
+`/api/embed` (batched) and `/api/embeddings` (one prompt) return unit
+vectors built from hashed words, with a few English words mapped to their
+Spanish FGJ labels, so paraphrase lookups can be exercised offline.
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANSWER = "According to the provided rows, the matching records are listed above."
+EMBED_DIM = 768  # as nomic-embed-text
+MODELS = ["stub-embed:latest", "phi3:latest"]  # listed by /api/tags
+# A hand-made thesaurus, so paraphrase checks against the stub only show the
+# plumbing works (batching, storage, ranking); they say nothing about how
+# well a real embedding model matches paraphrases
+SYNONYMS = {
+    "assault": "robo", "assaults": "robo", "robbery": "robo", "robberies": "robo", "mugging": "robo",
+    "theft": "robo", "subway": "metro", "pedestrian": "transeunte", "pedestrians": "transeunte",
+    "street": "transeunte", "murder": "homicidio", "car": "vehiculo", "cars": "vehiculo",
+    "shop": "negocio", "store": "negocio", "house": "casa", "violent": "violencia",
+}
+STOPWORDS = {"a", "al", "de", "del", "el", "en", "la", "las", "los", "y", "con", "sin", "por",
+             "the", "of", "in", "on", "at", "near", "by", "an", "and", "to"}
+
+
+def embed_text(text: str, dim: int = EMBED_DIM) -> list:
+    """Deterministic unit vector: each distinct content word adds ±1 to a hashed slot."""
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    vec = [0.0] * dim
+    words = {SYNONYMS.get(w, w) for w in re.findall(r"\w+", text)} - STOPWORDS
+    for word in sorted(words):
+        h = int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16)
+        vec[h % dim] += 1.0 if (h >> 64) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+def make_handler(answer: str = ANSWER, delay: float = 0.0, error: str = None, legacy_embed: bool = False):
+    """
+    Handler class for the stub. `delay` is slept before each streamed token;
+    with `error`, the stream stops after its first token with an
+    `{"error": ...}` chunk, as Ollama does when a model fails mid-answer.
+    `legacy_embed` drops `/api/embed`, like servers before Ollama 0.3.
+    The model "missing" gets Ollama's 404 `{"error": ...}`.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        requests_seen = 0
+        connections = 0
+        paths = []
+
+        def setup(self):
+            super().setup()
+            type(self).connections += 1
+
+        def log_message(self, *args):
+            pass
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _chunk(self, obj):
+            body = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(body):X}\r\n".encode() + body + b"\r\n")
+            self.wfile.flush()
+
+        def _json(self, obj, status: int = 200):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            type(self).requests_seen += 1
+            self.paths.append(self.path)
+            if self.path != "/api/tags":
+                self.send_error(404)
+                return
+            self._json({"models": [{"name": m, "model": m} for m in MODELS]})
+
+        def do_POST(self):
+            type(self).requests_seen += 1
+            self.paths.append(self.path)
+            if self.path in ("/api/embed", "/api/embeddings"):
+                req = self._read_json()  # read first: the connection is reused after a 404 too
+                if legacy_embed and self.path == "/api/embed":
+                    self.send_error(404)
+                    return
+                if req.get("model") == "missing":
+                    self._json({"error": "model \"missing\" not found, try pulling it first"}, status=404)
+                    return
+            if self.path == "/api/embed":
+                texts = req.get("input") or []
+                texts = [texts] if isinstance(texts, str) else texts
+                self._json({"model": req.get("model"), "embeddings": [embed_text(t) for t in texts]})
+                return
+            if self.path == "/api/embeddings":
+                self._json({"embedding": embed_text(req.get("prompt", ""))})
+                return
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            req = self._read_json()
+            limit = (req.get("options") or {}).get("num_predict")
+            words = answer.split(" ")[:limit] if limit else answer.split(" ")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, w in enumerate(words):
+                if delay:
+                    time.sleep(delay)
+                self._chunk({"model": req.get("model"), "response": w if i == 0 else " " + w, "done": False})
+                if error is not None:
+                    self._chunk({"error": error})
+                    break
+            else:
+                self._chunk({"model": req.get("model"), "response": "", "done": True})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
+
+
+@contextlib.contextmanager
+def serve(port: int = 0, answer: str = ANSWER, delay: float = 0.0, handler=None):
+    """
+    Runs the stub in a background thread; yields its base URL. Pass a
+    `make_handler(...)` class as `handler` to read its counters afterwards.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler or make_handler(answer, delay))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub Ollama server")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between streamed tokens")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(delay=args.delay))
+    print(f"Stub Ollama on http://127.0.0.1:{args.port}")
+    server.serve_forever()
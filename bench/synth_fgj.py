@@ -0,0 +1,152 @@
+"""
+Synthetic FGJ "carpetas de investigación" extract with the schema of
+`data/carpetasFGJ_sample.csv`, for benchmarking at production scale:
+
+    python -m bench.synth_fgj --rows 1000000            # -> data/synthetic/carpetasFGJ_1000000.csv
+    python -m bench.synth_fgj --rows 10000000 --out /tmp/fgj_10m.csv
+
+Categorical fields are resampled as whole tuples from the sample, so each
+offence keeps its category and each colonia its alcaldía. Locations are
+jittered around the sample's colonias and the metro stations. Hours follow
+a day/night profile, and filing dates trail the incident by a skewed delay.
+Rows are written in `fecha_inicio` order, like the real export, in
+bounded chunks.
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+from utils.crime_store import CRIME_COLUMNS, load_crimes
+
+SAMPLE_CSV = "data/carpetasFGJ_sample.csv"
+SAMPLE_PARQUET = "data/carpetasFGJ_parquet"
+OUT_DIR = "data/synthetic"
+START, END = np.datetime64("2016-01-01"), np.datetime64("2025-01-01")
+CHUNK_ROWS = 500_000
+
+MONTHS = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+          "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"]
+# Share of incidents per hour of day (quiet before dawn, peaks at noon and evening)
+HOUR_PROFILE = np.array([3.2, 2.2, 1.6, 1.2, 1.0, 1.2, 2.0, 3.0, 4.2, 4.6, 4.8, 5.0,
+                         5.6, 5.2, 5.0, 4.9, 5.0, 5.3, 5.6, 5.7, 5.4, 4.9, 4.3, 3.6])
+HOUR_PROFILE = HOUR_PROFILE / HOUR_PROFILE.sum()
+
+OFFENCE = ["delito", "categoria_delito", "competencia"]
+OFFICE = ["fiscalia", "agencia", "unidad_investigacion"]
+PLACE = ["colonia_hecho", "colonia_catalogo", "alcaldia_hecho", "alcaldia_catalogo", "municipio_hecho"]
+
+JITTER_DEG = 0.01           # ~1 km around a sample location
+STATION_SHARE = 0.4         # locations drawn around metro stations instead
+STATION_JITTER_DEG = 0.006
+
+
+def _tuples(df: pd.DataFrame, cols) -> pd.DataFrame:
+    return df[cols].astype(object).where(df[cols].notna(), None).reset_index(drop=True)
+
+
+class SampleModel:
+    """Empirical distributions taken from the sample extract."""
+
+    def __init__(self, csv_path: str = SAMPLE_CSV, stations_path: str = "data/metro_stations.csv"):
+        df = load_crimes(csv_path=csv_path, out_dir=SAMPLE_PARQUET).reset_index(drop=True)
+        self.offence = _tuples(df, OFFENCE)
+        self.office = _tuples(df, OFFICE)
+        self.place = _tuples(df, PLACE)
+        lat = df["latitud"].to_numpy(np.float64, na_value=np.nan)
+        lon = df["longitud"].to_numpy(np.float64, na_value=np.nan)
+        self.located = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        self.lat, self.lon = lat, lon
+        self.missing_xy = 1 - len(self.located) / len(df)
+        stations = pd.read_csv(stations_path)
+        self.st_lat = stations["latitud"].to_numpy(np.float64)
+        self.st_lon = stations["longitud"].to_numpy(np.float64)
+        # Names for station-based points come from the closest sample location
+        d = (self.st_lat[:, None] - lat[self.located]) ** 2 + (self.st_lon[:, None] - lon[self.located]) ** 2
+        self.st_place = self.located[np.argmin(d, axis=1)]
+
+    def chunk(self, rng: np.random.Generator, n: int, t0, t1) -> pa.Table:
+        """`n` rows filed between `t0` and `t1`, sorted by filing time."""
+        # Filing time, then the incident some skewed delay earlier
+        span = int((t1 - t0) / np.timedelta64(1, "s"))
+        filed = np.sort(t0.astype("datetime64[s]") + rng.integers(0, span, n).astype("timedelta64[s]"))
+        midnight = rng.random(n) < 0.3  # many carpetas carry a 00:00:00 filing hour
+        filed = np.where(midnight, filed.astype("datetime64[D]").astype("datetime64[s]"), filed)
+        delay_days = np.where(rng.random(n) < 0.4, 0, np.minimum(rng.lognormal(0.7, 1.2, n), 3650)).astype(np.int64)
+        day = filed.astype("datetime64[D]") - delay_days.astype("timedelta64[D]")
+        hour = rng.choice(24, n, p=HOUR_PROFILE)
+        minute = np.where(rng.random(n) < 0.6, rng.choice([0, 15, 30, 45], n), rng.integers(0, 60, n))
+        happened = day.astype("datetime64[s]") + (hour * 3600 + minute * 60).astype("timedelta64[s]")
+        happened = np.minimum(happened, filed)
+
+        o = rng.integers(0, len(self.offence), n)
+        f = rng.integers(0, len(self.office), n)
+        # Location: none, around a sample location, or around a metro station
+        kind = rng.random(n)
+        p = self.located[rng.integers(0, len(self.located), n)]
+        lat = self.lat[p] + rng.normal(0, JITTER_DEG, n)
+        lon = self.lon[p] + rng.normal(0, JITTER_DEG, n)
+        near_station = kind < STATION_SHARE
+        s = rng.integers(0, len(self.st_lat), n)
+        lat = np.where(near_station, self.st_lat[s] + rng.normal(0, STATION_JITTER_DEG, n), lat)
+        lon = np.where(near_station, self.st_lon[s] + rng.normal(0, STATION_JITTER_DEG, n), lon)
+        p = np.where(near_station, self.st_place[s], p)
+        no_xy = kind > 1 - self.missing_xy
+        p = np.where(no_xy, rng.integers(0, len(self.place), n), p)
+
+        cols = {}
+        for name, when in (("inicio", filed), ("hecho", happened)):
+            year = when.astype("datetime64[Y]").astype(np.int64) + 1970
+            month = when.astype("datetime64[M]").astype(np.int64) % 12
+            cols[f"anio_{name}"] = pa.array(year) if name == "inicio" else pa.array(year.astype(np.float64))
+            cols[f"mes_{name}"] = pa.array(np.asarray(MONTHS, dtype=object)[month])
+            cols[f"fecha_{name}"] = pa.array(np.datetime_as_string(when, unit="D"))
+            cols[f"hora_{name}"] = pa.array(np.char.partition(np.datetime_as_string(when, unit="s"), "T")[:, 2])
+        for frame, idx in ((self.offence, o), (self.office, f), (self.place, p)):
+            for c in frame.columns:
+                cols[c] = pa.array(frame[c].to_numpy()[idx], type=pa.string())
+        cols["latitud"] = pa.array(np.round(lat, 5), mask=no_xy)
+        cols["longitud"] = pa.array(np.round(lon, 5), mask=no_xy)
+        return pa.table({c: cols[c] for c in CRIME_COLUMNS})
+
+
+def generate(rows: int, out_path: str = None, seed: int = 0, csv_path: str = SAMPLE_CSV,
+             chunk_rows: int = CHUNK_ROWS) -> str:
+    """Writes `rows` synthetic carpetas to `out_path` (CSV); returns the path."""
+    out_path = out_path or os.path.join(OUT_DIR, f"carpetasFGJ_{rows}.csv")
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    model = SampleModel(csv_path)
+    rng = np.random.default_rng(seed)
+    n_chunks = max(1, -(-rows // chunk_rows))
+    # Each chunk covers its own slice of the period, so the file is in filing order
+    edges = START + ((END - START) * np.arange(n_chunks + 1) // n_chunks)
+    tmp = out_path + ".tmp"
+    writer = None
+    try:
+        for i in range(n_chunks):
+            n = rows // n_chunks + (1 if i < rows % n_chunks else 0)
+            table = model.chunk(rng, n, edges[i], edges[i + 1])
+            if writer is None:
+                writer = pv.CSVWriter(tmp, table.schema, write_options=pv.WriteOptions(quoting_style="needed"))
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp, out_path)
+    return out_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic FGJ extract")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    path = generate(args.rows, args.out, args.seed)
+    print(f"{args.rows:,} rows -> {path} ({os.path.getsize(path) / 2 ** 20:,.0f} MB) "
+          f"in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,171 @@
+import functools
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import scipy.sparse as sp
+
+from utils.crime_store import CSV_PATH, PARQUET_DIR, open_dataset
+
+MODEL_PATH = "data/derived/models/crime_category_sgd.joblib"
+TARGET = "categoria_delito"
+COLUMNS = ["fecha_inicio", "hora_inicio", "fecha_hecho", "hora_hecho",
+           "alcaldia_hecho", "latitud", "longitud", TARGET]
+BATCH_ROWS = 50_000
+
+# Fixed (not data-fitted) scaling, so every batch is encoded identically
+LAT0, LON0, COORD_SCALE = 19.40, -99.13, 0.15
+GRID_DEG = 0.01  # ~1 km location cells, hashed as categorical tokens
+HASH_FEATURES = 2 ** 14
+
+
+@functools.cache
+def _hasher():
+    # sklearn is imported on first use, not when the page imports this module
+    from sklearn.feature_extraction import FeatureHasher
+    return FeatureHasher(n_features=HASH_FEATURES, input_type="string", alternate_sign=False)
+
+
+def encode(batch: pd.DataFrame) -> sp.csr_matrix:
+    """
+    Stateless features for one batch: cyclic hour, weekday and month, scaled
+    coordinates, and hashed alcaldía / 1 km grid cell / alcaldía×hour tokens.
+    """
+    when = pd.to_datetime(batch["fecha_hecho"].astype(str) + " " + batch["hora_hecho"].fillna("00:00:00").astype(str),
+                          format="%Y-%m-%d %H:%M:%S", errors="coerce")
+    hour = (when.dt.hour + when.dt.minute / 60).fillna(12).to_numpy()
+    wday = when.dt.weekday.fillna(0).to_numpy()
+    month = when.dt.month.fillna(1).to_numpy()
+    lat = batch["latitud"].to_numpy(np.float64, na_value=np.nan)
+    lon = batch["longitud"].to_numpy(np.float64, na_value=np.nan)
+    has_xy = np.isfinite(lat) & np.isfinite(lon)
+
+    dense = np.column_stack([
+        np.sin(2 * np.pi * hour / 24), np.cos(2 * np.pi * hour / 24),
+        np.sin(2 * np.pi * wday / 7), np.cos(2 * np.pi * wday / 7),
+        np.sin(2 * np.pi * month / 12), np.cos(2 * np.pi * month / 12),
+        np.where(has_xy, (lat - LAT0) / COORD_SCALE, 0.0),
+        np.where(has_xy, (lon - LON0) / COORD_SCALE, 0.0),
+        has_xy.astype(np.float64),
+    ])
+
+    alc = batch["alcaldia_hecho"].astype("string").fillna("?")
+    cell = pd.Series(np.floor(np.nan_to_num(lon) / GRID_DEG).astype(np.int64).astype(str), index=batch.index) \
+        + "_" + pd.Series(np.floor(np.nan_to_num(lat) / GRID_DEG).astype(np.int64).astype(str), index=batch.index)
+    tokens = np.column_stack([
+        ("a=" + alc).to_numpy(dtype=object),
+        np.where(has_xy, ("g=" + cell).to_numpy(dtype=object), "g=none"),
+        ("ah=" + alc + "_" + pd.Series(hour.astype(np.int64).astype(str), index=batch.index)).to_numpy(dtype=object),
+        np.char.add("wd=", wday.astype(np.int64).astype(str)).astype(object),
+    ])
+    return sp.hstack([sp.csr_matrix(dense), _hasher().transform(tokens)], format="csr")
+
+
+def _filed_at(batch: pd.DataFrame) -> pd.Series:
+    return batch["fecha_inicio"].astype(str) + " " + batch["hora_inicio"].fillna("00:00:00").astype(str)
+
+
+def scan_batches(dataset: ds.Dataset, after=None, batch_rows: int = BATCH_ROWS):
+    """
+    Yields pandas batches of the training columns, only for carpetas filed
+    after `after` ("YYYY-MM-DD HH:MM:SS"), which is pushed down to Parquet.
+    """
+    flt = ds.field(TARGET).is_valid()
+    if after:
+        flt = flt & (ds.field("fecha_inicio") >= after[:10])
+    for rb in dataset.to_batches(columns=COLUMNS, filter=flt, batch_size=batch_rows):
+        batch = rb.to_pandas()
+        if after:
+            batch = batch[_filed_at(batch) > after]
+        if len(batch):
+            yield batch
+
+
+def known_classes(dataset: ds.Dataset) -> list:
+    """Distinct target values, reading only that column."""
+    col = dataset.to_table(columns=[TARGET])[TARGET]
+    return sorted(v for v in pc.unique(col).to_pylist() if v is not None)
+
+
+class IncrementalCrimeModel:
+    """
+    `categoria_delito` classifier trained with `partial_fit`, one bounded
+    batch at a time. It remembers the last filing timestamp it saw, so a
+    new monthly extract only trains on the new carpetas.
+    """
+
+    def __init__(self, classes):
+        self.classes = list(classes)
+        from sklearn.linear_model import SGDClassifier
+        self.clf = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=42)
+        self.trained_through = None
+        self.rows_seen = 0
+        # Progressive validation: each batch is scored before it is learned
+        self.correct = 0
+        self.scored = 0
+        self.history = []
+
+    @property
+    def accuracy(self) -> float:
+        return self.correct / self.scored if self.scored else float("nan")
+
+    def update(self, batches, progress=None) -> int:
+        """Trains on `batches`; returns the number of new rows learned."""
+        learned = 0
+        for batch in batches:
+            y = batch[TARGET].astype(str).to_numpy()
+            known = np.isin(y, self.classes)
+            if not known.all():
+                # A category unseen at creation cannot be added to an SGD model
+                batch, y = batch[known], y[known]
+                if not len(batch):
+                    continue
+            X = encode(batch)
+            if self.rows_seen:
+                self.correct += int((self.clf.predict(X) == y).sum())
+                self.scored += len(y)
+            self.clf.partial_fit(X, y, classes=self.classes)
+            self.rows_seen += len(y)
+            learned += len(y)
+            last = _filed_at(batch).max()
+            self.trained_through = max(filter(None, [self.trained_through, last]))
+            if progress is not None:
+                progress(self.rows_seen)
+        self.history.append({"at": time.strftime("%Y-%m-%d %H:%M:%S"), "rows": learned,
+                             "through": self.trained_through})
+        return learned
+
+    def predict_proba(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame(self.clf.predict_proba(encode(frame)), columns=self.clf.classes_, index=frame.index)
+
+    def save(self, path: str = MODEL_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self, path + ".tmp")
+        os.replace(path + ".tmp", path)
+
+    @staticmethod
+    def load(path: str = MODEL_PATH):
+        try:
+            return joblib.load(path)
+        except (OSError, EOFError, ValueError):
+            return None
+
+
+def train_or_resume(path: str = MODEL_PATH, csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR,
+                    batch_rows: int = BATCH_ROWS, progress=None) -> IncrementalCrimeModel:
+    """
+    Continues the stored model with carpetas filed after its last update
+    (or trains from scratch), streaming the Parquet store in batches so
+    memory stays bounded by `batch_rows`.
+    """
+    dataset = open_dataset(csv_path, out_dir)
+    model = IncrementalCrimeModel.load(path)
+    if model is None:
+        model = IncrementalCrimeModel(known_classes(dataset))
+    model.update(scan_batches(dataset, model.trained_through, batch_rows), progress)
+    model.save(path)
+    return model
@@ -1,53 +1,135 @@
 import streamlit as st
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, confusion_matrix
-import sys
 import os
 from utils.theme import theme_css
+from ml.registry import data_hash, fit_or_load
+from ml.tuning import GRIDS, crime_data_id, crime_training_set, load_results, tune, tuning_key
+from ml.crime_model import MODEL_PATH, IncrementalCrimeModel, train_or_resume
+from utils.crime_store import dataset_version
+from utils.metro import station_alcaldias, station_index
+from utils.penguins import features_target, filter_species, load_penguins, species_options
+from utils.metrics import cache_resource, section
+from utils.jobs import run_job
 
 st.session_state.setdefault("theme_mode", "auto")
 st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 
-# Get the absolute path of the `module1` directory
-eda_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../EDA"))
-# Add it to sys.path
-sys.path.append(eda_path)
-
-# Now, you can import `eda.py`
-import eda
-
 st.header("🤖 Machine Learning")
 
 
 # Define features and target
-X = eda.filtered_data[['bill_length_mm', 'bill_depth_mm', 'flipper_length_mm', 'body_mass_g']].dropna()
-y = eda.filtered_data['species'].dropna()
-
-# Train-Test Split
-if not X.empty and not y.empty:
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+with section("load"):
+    penguins = load_penguins()
+species = st.multiselect("Select Species", options=species_options(penguins), default=species_options(penguins))
+X, y = features_target(filter_species(penguins, species))
 
-    # Train the Random Forest Classifier
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(X_train, y_train)
+# Tuning mode: successive halving over a grid, fitted on all cores; the
+# leaderboard is stored per data + grid so it is shown without recomputing
+def tuning_panel(name, data_id, run):
+    grid = {p: st.multiselect(p, options=vals, default=vals, key=f"{name}_{p}")
+            for p, vals in GRIDS[name].items()}
+    col1, col2 = st.columns(2)
+    factor = col1.slider("Halving factor", 2, 4, 3, key=f"{name}_factor",
+                         help="Only the best 1/factor configurations get factor× more rows each round.")
+    cv = col2.slider("CV folds", 2, 5, 3, key=f"{name}_cv")
+    if not all(grid.values()):
+        st.warning("Pick at least one value per hyperparameter.")
+        return None
+    key = tuning_key(name, data_id, grid, factor, cv)
+    if st.button("Run search", key=f"{name}_run"):
+        run_job(f"tune_{name}", ("tune", key), lambda job: run(grid, factor, cv), label="Searching (all cores)…")
+    tuned = load_results(key)
+    if tuned is None:
+        st.info("No stored results for this grid yet.")
+        return None
+    st.caption(f"{tuned['n_candidates']} configurations · {tuned['n_iterations']} rounds · "
+               f"{tuned['seconds']:.1f}s · finished {tuned['finished_at']} · "
+               f"best CV accuracy {tuned['best_score']:.1%}")
+    st.dataframe(tuned["leaderboard"], width='stretch', hide_index=True)
+    return tuned
 
-    # Predictions
-    y_pred = model.predict(X_test)
+# Train once per data slice + hyperparameters; later reruns, sessions and
+# restarts reuse the stored model and metrics
+if not X.empty and not y.empty:
+    params = {"n_estimators": 100, "random_state": 42}
+    with st.expander("🎯 Tuning mode (random forest)"):
+        tuned = tuning_panel("random_forest", data_hash(X, y),
+                             lambda grid, factor, cv: tune("random_forest", X, y, grid=grid, factor=factor, cv=cv))
+        if tuned is not None and st.checkbox("Use the best configuration below"):
+            params = tuned["best_params"]
+    with section("train"):
+        split = {"test_size": 0.2, "random_state": 42}
+        # A single fit that cannot be interrupted, so it runs here rather than
+        # as a cancellable pool job; the registry cache shares it across sessions
+        result, trained = fit_or_load("random_forest", X, y, params, **split)
+    st.caption(f"Model trained {result['trained_at']} on {result['n_train']} rows "
+               f"in {result['train_seconds']:.2f}s" + ("" if trained else " (cached)"))
 
     # Display the classification report
     st.write("### Classification Report")
-    st.text(classification_report(y_test, y_pred))
+    st.text(result["report"])
 
-    # Confusion Matrix
+    # Confusion Matrix (plotting libraries load only when a model is shown)
     st.write("### Confusion Matrix")
-    cm = confusion_matrix(y_test, y_pred)
-    plt.figure(figsize=(10, 5))
-    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=model.classes_, yticklabels=model.classes_)
-    plt.title("Confusion Matrix")
-    plt.xlabel("Predicted")
-    plt.ylabel("True")
-    st.pyplot(plt)
+    with section("plot"):
+        import seaborn as sns
+        import matplotlib.pyplot as plt
+        cm = result["confusion"]
+        fig, ax = plt.subplots(figsize=(10, 5))
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', xticklabels=result["classes"], yticklabels=result["classes"], ax=ax)
+        ax.set_title("Confusion Matrix")
+        ax.set_xlabel("Predicted")
+        ax.set_ylabel("True")
+        st.pyplot(fig)
+        plt.close(fig)
+
+
+# Crime category model: trained out-of-core over the whole FGJ history and
+# resumed with only the new carpetas when a newer extract is loaded
+st.write("### Crime Category Model (FGJ)")
+
+@cache_resource(show_spinner=False)
+def load_crime_model(mtime):
+    return IncrementalCrimeModel.load(MODEL_PATH)
+
+def _model_mtime():
+    return os.path.getmtime(MODEL_PATH) if os.path.exists(MODEL_PATH) else None
+
+if st.button("Train / update with new data"):
+    run_job("crime_model", ("crime_model", dataset_version()),
+            lambda job: train_or_resume(progress=lambda n: job.report(message=f"{n:,} rows")),
+            label="Training on new carpetas…")
+
+crime_model = load_crime_model(_model_mtime())
+if crime_model is None:
+    st.info("No crime model yet. Train it once; later updates only read newly filed carpetas.")
+else:
+    st.caption(f"{crime_model.rows_seen:,} rows learned · data through {crime_model.trained_through} · "
+               f"progressive accuracy {crime_model.accuracy:.1%}")
+    stations = station_index().stations
+    col1, col2, col3 = st.columns(3)
+    station = col1.selectbox("Near metro station", options=stations['estacion'])
+    hour = col2.slider("Hour", 0, 23, 20)
+    weekday = col3.selectbox("Weekday", options=list(range(7)),
+                             format_func=lambda d: ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"][d])
+    where = stations[stations['estacion'] == station].iloc[0]
+    # The model learned alcaldía and alcaldía×hour tokens: use the station's
+    # usual alcaldía rather than an unknown one
+    alcaldia = station_alcaldias().get(station)
+    # 2024-01-01 is a Monday, so the day offset gives the chosen weekday
+    query = pd.DataFrame({
+        'fecha_hecho': [(pd.Timestamp("2024-01-01") + pd.Timedelta(days=weekday)).strftime("%Y-%m-%d")],
+        'hora_hecho': [f"{hour:02d}:00:00"],
+        'alcaldia_hecho': [alcaldia],
+        'latitud': [where['latitud']],
+        'longitud': [where['longitud']],
+    })
+    proba = crime_model.predict_proba(query).iloc[0].sort_values(ascending=False)
+    st.caption(f"{station} · alcaldía {alcaldia or 'unknown'} · {hour:02d}:00")
+    st.bar_chart(proba.head(8))
+
+with st.expander("🎯 Tuning mode (crime category, full table)"):
+    def _tune_crimes(grid, factor, cv):
+        X_c, y_c = crime_training_set()
+        tune("sgd", X_c, y_c, crime_data_id(), grid=grid, factor=factor, cv=cv)
+    tuning_panel("sgd", crime_data_id(), _tune_crimes)
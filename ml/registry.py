@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+import time
+from importlib import import_module
+from importlib.metadata import version
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from utils.metrics import cache_resource
+
+REGISTRY_DIR = "data/derived/models"
+SKLEARN_VERSION = version("scikit-learn")  # read from package metadata: importing sklearn takes seconds
+
+# Estimator classes by import path, imported on first fit
+ESTIMATORS = {
+    "random_forest": "sklearn.ensemble.RandomForestClassifier",
+    "sgd": "sklearn.linear_model.SGDClassifier",
+}
+
+
+def estimator(name: str, **params):
+    """A new, unfitted `ESTIMATORS[name]`."""
+    module, cls = ESTIMATORS[name].rsplit(".", 1)
+    return getattr(import_module(module), cls)(**params)
+
+
+def data_hash(X: pd.DataFrame, y: pd.Series) -> str:
+    """Content hash of a training slice (values, columns and order)."""
+    h = hashlib.sha256()
+    h.update(json.dumps([str(c) for c in X.columns]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def model_key(name: str, X: pd.DataFrame, y: pd.Series, params: dict, split: dict) -> str:
+    meta = json.dumps({"name": name, "params": params, "split": split, "sklearn": SKLEARN_VERSION},
+                      sort_keys=True, default=str)
+    return hashlib.sha256((data_hash(X, y) + meta).encode("utf-8")).hexdigest()[:20]
+
+
+class ModelRegistry:
+    """Fitted models and their metrics as joblib files, one per key."""
+
+    def __init__(self, path: str = REGISTRY_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.joblib")
+
+    def load(self, key: str):
+        try:
+            return joblib.load(self._file(key))
+        except (OSError, EOFError, ValueError):
+            return None
+
+    def save(self, key: str, entry: dict):
+        tmp = self._file(key) + ".tmp"
+        joblib.dump(entry, tmp, compress=3)
+        os.replace(tmp, self._file(key))
+
+
+def train_classifier(name: str, X: pd.DataFrame, y: pd.Series, params: dict,
+                     test_size: float = 0.2, random_state: int = 42) -> dict:
+    """
+    Fits `ESTIMATORS[name](**params)` on a train split using every core and
+    returns the model with its held-out metrics.
+    """
+    from sklearn.metrics import classification_report, confusion_matrix
+    from sklearn.model_selection import train_test_split
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    model = estimator(name, **params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=-1)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    y_pred = model.predict(X_test)
+    return {
+        "model": model,
+        "classes": list(model.classes_),
+        "report": classification_report(y_test, y_pred),
+        "confusion": confusion_matrix(y_test, y_pred, labels=model.classes_),
+        "accuracy": float(np.mean(np.asarray(y_pred) == np.asarray(y_test))),
+        "train_seconds": train_seconds,
+        "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "n_train": len(X_train),
+    }
+
+
+@cache_resource(show_spinner="Training model (first time only)…", max_entries=16)
+def _fit_or_load(key: str, name: str, _X, _y, params_json: str, test_size: float, random_state: int,
+                 _on_train=None) -> dict:
+    registry = ModelRegistry()
+    entry = registry.load(key)
+    if entry is None:
+        entry = train_classifier(name, _X, _y, json.loads(params_json), test_size, random_state)
+        registry.save(key, entry)
+        if _on_train is not None:
+            _on_train(key)
+    return entry
+
+
+def fit_or_load(name: str, X: pd.DataFrame, y: pd.Series, params: dict,
+                test_size: float = 0.2, random_state: int = 42):
+    """
+    `(entry, trained)`: fitted model + metrics for this exact data slice and
+    configuration, from memory if any session already has it, else from
+    disk, else trained once and stored (`trained` is then True). Survives
+    reruns, sessions and restarts.
+    """
+    split = {"test_size": test_size, "random_state": random_state}
+    key = model_key(name, X, y, params, split)
+    trained = []
+    entry = _fit_or_load(key, name, X, y, json.dumps(params, sort_keys=True), test_size, random_state,
+                         _on_train=trained.append)
+    return entry, bool(trained)
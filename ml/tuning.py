@@ -0,0 +1,136 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from ml.crime_model import TARGET, encode, scan_batches
+from ml.registry import SKLEARN_VERSION, data_hash, estimator
+from utils.crime_store import dataset_version, open_dataset
+
+TUNING_DIR = "data/derived/tuning"
+
+GRIDS = {
+    "random_forest": {
+        "n_estimators": [50, 100, 200],
+        "max_depth": [None, 4, 8],
+        "min_samples_leaf": [1, 3],
+    },
+    "sgd": {
+        "alpha": [1e-6, 1e-5, 1e-4, 1e-3],
+        "penalty": ["l2", "elasticnet"],
+        "loss": ["log_loss", "modified_huber"],
+    },
+}
+FIXED = {
+    "random_forest": {"random_state": 42},
+    "sgd": {"random_state": 42},
+}
+
+
+def tuning_key(name: str, data_id: str, grid: dict, factor: int, cv: int) -> str:
+    """`data_id` names the training data: `data_hash(X, y)` or a dataset version."""
+    meta = json.dumps({"name": name, "data": data_id, "grid": grid, "factor": factor, "cv": cv,
+                       "sklearn": SKLEARN_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(meta.encode("utf-8")).hexdigest()[:20]
+
+
+def _path(key: str) -> str:
+    return os.path.join(TUNING_DIR, f"{key}.json")
+
+
+def load_results(key: str):
+    """Stored leaderboard for `key` (as written by `tune`), or None."""
+    try:
+        with open(_path(key), encoding="utf-8") as f:
+            res = json.load(f)
+    except (OSError, ValueError):
+        return None
+    res["leaderboard"] = pd.DataFrame(res["leaderboard"])
+    return res
+
+
+def tune(name: str, X, y, data_id: str = None, grid=None, factor: int = 3, cv: int = 3,
+         min_resources="smallest", n_jobs: int = -1) -> dict:
+    """
+    Successive halving over `grid`: every configuration starts on a small
+    sample, and only the best 1/`factor` move on to `factor`× more rows.
+    Candidates are fitted in parallel on all cores (joblib process pool).
+    The leaderboard is stored under `data/derived/tuning/` and returned.
+    """
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401  (registers the class)
+    from sklearn.model_selection import HalvingGridSearchCV
+
+    grid = grid or GRIDS[name]
+    key = tuning_key(name, data_id or data_hash(X, y), grid, factor, cv)
+    search = HalvingGridSearchCV(
+        estimator(name, **FIXED.get(name, {})), grid, factor=factor, cv=cv,
+        resource="n_samples", min_resources=min_resources, n_jobs=n_jobs,
+        random_state=42, refit=False, error_score="raise",
+    )
+    start = time.perf_counter()
+    search.fit(X, y)
+    elapsed = time.perf_counter() - start
+
+    # One row per configuration, at the last round it reached; best first
+    cv_res = pd.DataFrame(search.cv_results_)
+    cv_res["params"] = cv_res["params"].map(lambda p: json.dumps(p, sort_keys=True, default=str))
+    board = (cv_res.sort_values(["iter", "mean_test_score"], ascending=False, kind="stable")
+             .drop_duplicates("params")
+             [["params", "iter", "n_resources", "mean_test_score", "std_test_score", "mean_fit_time"]]
+             .reset_index(drop=True))
+    res = {
+        "key": key,
+        "name": name,
+        "best_params": {**FIXED.get(name, {}), **json.loads(board.loc[0, "params"])},
+        "best_score": float(board.loc[0, "mean_test_score"]),
+        "n_candidates": int(len(search.cv_results_["params"])),
+        "n_iterations": int(search.n_iterations_),
+        "seconds": elapsed,
+        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "leaderboard": board.to_dict(orient="list"),
+    }
+    os.makedirs(TUNING_DIR, exist_ok=True)
+    with open(_path(key) + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(res, f, default=str)
+    os.replace(_path(key) + ".tmp", _path(key))
+    res["leaderboard"] = board
+    return res
+
+
+def crime_training_set(limit=None):
+    """
+    Encoded features + `categoria_delito` for the whole crime table (or its
+    first `limit` rows), encoded batch by batch into one sparse matrix.
+    """
+    dataset = open_dataset()
+    Xs, ys, n = [], [], 0
+    for batch in scan_batches(dataset):
+        if limit is not None:
+            batch = batch.head(limit - n)
+        Xs.append(encode(batch))
+        ys.append(batch[TARGET].astype(str).to_numpy())
+        n += len(batch)
+        if limit is not None and n >= limit:
+            break
+    return sp.vstack(Xs, format="csr"), np.concatenate(ys)
+
+
+def crime_data_id(limit=None) -> str:
+    return f"fgj-{dataset_version()}-{limit}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Successive-halving search for the crime category model")
+    parser.add_argument("--limit", type=int, default=None, help="only the first N rows")
+    parser.add_argument("--factor", type=int, default=3)
+    parser.add_argument("--cv", type=int, default=3)
+    args = parser.parse_args()
+    X, y = crime_training_set(args.limit)
+    out = tune("sgd", X, y, crime_data_id(args.limit), factor=args.factor, cv=args.cv)
+    print(out["leaderboard"].head(10).to_string())
+    print(f"best {out['best_params']} score {out['best_score']:.3f} in {out['seconds']:.1f}s")
@@ -1,10 +1,20 @@
+import json
 import streamlit as st
-import pandas as pd
 import numpy as np
-import requests, json
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import requests
 from utils.theme import theme_css
+from utils.crime_store import dataset_version, shared_crimes
+from ollama.retriever import crime_retriever, question_filters
+from ollama.embeddings import EMBED_MODEL, crime_embeddings, crime_embeddings_exist, store_path
+from ollama.client import OLLAMA_URL, get_client, render_stream
+from ollama.llm_cache import cache_key, get_cache
+from ollama.scheduler import get_scheduler
+from ollama.context import build_context, estimate_tokens
+from ollama.structured import DIM_LABELS, answer_aggregate
+from utils.cube import crime_cube
+from utils.facets import crime_facets
+from utils.metrics import add_time, section
+from utils.jobs import run_job
 
 '''
 KEY QUESTIONS:
@@ -28,28 +38,72 @@ st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 st.set_page_config(page_title="Local CSV Chat (Ollama)", page_icon="📚")
 st.title("📚 Chat with your CSV — 100% Local (Ollama)")
 
+@st.cache_data(ttl=30, show_spinner=False)
+def pulled_models(base_url: str) -> list:
+    # ":latest" is what a bare name resolves to, so both share one store
+    return [m.removesuffix(":latest") for m in get_client(base_url).models()]
+
 # ---------- Sidebar settings ----------
 with st.sidebar:
     st.header("Settings")
     model = st.text_input("Ollama model", value="phi3",
                           help="Examples: llama3, llama3:8b-instruct, phi3, mistral:instruct")
-    top_k = st.slider("Top-k rows as context", 1, 10, 3)
+    top_k = st.slider("Top-k rows as context", 1, 50, 3,
+                      help="Upper bound; rows are packed only while they fit the context window.")
     max_rows = st.number_input("Limit rows (speed)", 100, 100000, 1000, step=100)
     temperature = st.slider("Temperature", 0.0, 1.5, 0.7, 0.1)
     max_tokens = st.slider("Max new tokens", 32, 1024, 256, 32)
+    num_ctx = st.number_input("Context window (tokens)", 512, 32768, 2048, step=512,
+                              help="Model context size; prompt + answer must fit in it.")
+    use_filters = st.checkbox("Filter rows by what the question names", value=True,
+                              help="Year, month, hours, alcaldía, category or crime found in the question "
+                                   "narrow the rows before they are scored.")
+    bm25_weight = st.slider("BM25 weight", 0.0, 1.0, 0.5, 0.1,
+                            help="Ranking mixes BM25 and TF-IDF cosine; 0 is TF-IDF only.")
+    use_semantic = st.radio("Ranking", ["Lexical (BM25 + TF-IDF)", "Semantic (Ollama embeddings)"],
+                            help="Semantic ranking also matches paraphrases ('assaults near the subway' → "
+                                 "ROBO A TRANSEUNTE … METRO); it needs an embedding model pulled in Ollama.",
+                            ) != "Lexical (BM25 + TF-IDF)"
+    if use_semantic:
+        # Only models Ollama has: every name gets its own store on disk
+        try:
+            pulled = pulled_models(OLLAMA_URL)
+        except requests.exceptions.RequestException as e:
+            pulled = []
+            st.warning(f"⚠️ Could not list the models at {OLLAMA_URL}: {e}")
+        if pulled:
+            embed_model = st.selectbox("Embedding model", pulled,
+                                       index=pulled.index(EMBED_MODEL) if EMBED_MODEL in pulled else 0,
+                                       help="Models pulled in Ollama. Embedding ones include nomic-embed-text, "
+                                            "mxbai-embed-large and all-minilm.")
+        else:
+            st.caption(f"No models to embed with; ranking stays lexical. Try `ollama pull {EMBED_MODEL}`.")
+            use_semantic = False
+    use_cube = st.checkbox("Answer counts/rankings from the aggregate table", value=True,
+                           help="Questions like 'which alcaldía had the most robberies in 2016' are answered "
+                                "exactly from precomputed totals instead of the top-k rows.")
+    use_llm_cache = st.checkbox("Reuse cached answers", value=True)
+    deterministic_only = st.checkbox("Only cache temperature 0 answers", value=False,
+                                     help="Sampling at temperature > 0 gives different answers each time; "
+                                          "enable to keep only reproducible ones.")
+    cache_stats = get_cache().stats()
+    st.caption(f"Answer cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits · "
+               f"{cache_stats['misses']} misses · {cache_stats['hit_rate']:.0%} hit rate")
+    queue = get_scheduler().stats()
+    st.caption(f"Ollama queue: {queue['running']} generating · {queue['queued']} waiting · "
+               f"median wait {queue['median_queue_s']:.1f}s vs {queue['median_generate_s']:.1f}s generating "
+               f"({queue['answers']} answers, {queue['shared']} shared)")
     if st.button("🔄 Reset chat"):
         st.session_state.messages = [{"role": "assistant", "content": "New chat started!"}]
         st.rerun()
 
-# ---------- CSV upload ----------
-file = 'data/carpetasFGJ_sample.csv'
-
-@st.cache_data(show_spinner=False)
-def load_df(_file, _max_rows):
-    df = pd.read_csv(_file)
-    return df.head(_max_rows).copy() if len(df) > _max_rows else df
+# ---------- Crime data (shared, read-only) ----------
+def load_df(_max_rows):
+    # Row slice of the process-wide frame; no per-session copy
+    return shared_crimes().head(int(_max_rows))
 
-df = load_df(file, max_rows)
+with section("load"):
+    df = load_df(max_rows)
 st.success(f"Loaded {len(df):,} rows × {len(df.columns)} cols")
 st.dataframe(df.head(10), width='stretch')
 
@@ -63,21 +117,59 @@ if not text_cols:
     st.warning("Select at least one column for the retriever.")
     st.stop()
 
-# ---------- Build TF-IDF retriever ----------
-@st.cache_data(show_spinner=False)
-def build_corpus_vectors(_df: pd.DataFrame, _cols):
-    text_series = _df[_cols].astype(str).apply(lambda r: " | ".join(r.values), axis=1)
-    vec = TfidfVectorizer(strip_accents="unicode", ngram_range=(1, 2), min_df=1)
-    X = vec.fit_transform(text_series.values)
-    return text_series, vec, X
+# ---------- TF-IDF retriever (persistent, shared by all sessions) ----------
+# Indexed once over the full table per column set; `max_rows` only limits
+# which rows are scored. Built in the background: sessions asking for the
+# same columns share one build, and changing the columns cancels it
+with section("load"):
+    retriever = run_job("retriever", ("retriever", dataset_version(), tuple(text_cols)),
+                        lambda job: crime_retriever(text_cols, progress=job.report),
+                        label="Indexing rows for retrieval…")
 
-text_series, vectorizer, X = build_corpus_vectors(df, text_cols)
+# ---------- Embedding store (optional, memory-mapped, shared) ----------
+# Each distinct row text is embedded once through Ollama and kept on disk;
+# a stopped run resumes from the last stored batch
+embeddings = None
+if use_semantic:
+    # The store (row ids for the whole table) is only written once asked for
+    with section("load"):
+        store = crime_embeddings(text_cols, embed_model) if crime_embeddings_exist(text_cols, embed_model) else None
+    if store is None or store.pending:
+        progress = f"{store.done:,} of {len(store.texts):,}" if store is not None else "no"
+        st.info(f"Semantic ranking: {progress} distinct row texts embedded with `{embed_model}`; "
+                "rows are ranked by words until all are.")
+        if st.button("Compute embeddings (resumes where it stopped)"):
+            try:
+                run_job("embeddings", ("embeddings", store_path(text_cols, embed_model), dataset_version()),
+                        lambda job: crime_embeddings(text_cols, embed_model).embed_pending(
+                            get_client(), progress=job.report),
+                        label="Embedding row texts with Ollama…")
+            except (requests.exceptions.RequestException, RuntimeError) as e:
+                st.warning(f"⚠️ Could not embed with `{embed_model}` at {OLLAMA_URL}: {e}")
+            else:
+                st.rerun()  # the counts above were read before the run
+    else:
+        embeddings = store
 
 def retrieve(query: str, k: int):
-    qv = vectorizer.transform([query])
-    sims = cosine_similarity(qv, X).ravel()
-    idx = np.argsort(-sims)[:k]
-    return idx, sims[idx]
+    """Top-k rows within the loaded slice, pre-filtered by the question's constraints."""
+    rows, filters = question_filters(query, crime_facets()) if use_filters else (None, {})
+    if rows is not None:
+        rows = rows[:np.searchsorted(rows, len(df))]
+        if not len(rows):
+            rows, filters = None, {}  # matches exist only beyond the row limit
+    if embeddings is not None:
+        try:
+            query_vec = embeddings.embed_query(get_client(), query)
+        except requests.exceptions.ConnectionError:
+            st.warning(f"⚠️ Cannot reach Ollama at {OLLAMA_URL}; rows ranked by words instead.")
+        except (requests.exceptions.RequestException, RuntimeError) as e:
+            st.warning(f"⚠️ Semantic ranking unavailable ({e}); rows ranked by words instead.")
+        else:
+            idxs, scores = embeddings.search(query_vec, k, rows=rows, limit=len(df))
+            return idxs, scores, rows, filters, f"by meaning, `{embeddings.meta['model']}`"
+    idxs, scores = retriever.hybrid_search(query, k, rows=rows, limit=len(df), bm25_weight=bm25_weight)
+    return idxs, scores, rows, filters, "by words"
 
 # ---------- Chat state ----------
 if "messages" not in st.session_state:
@@ -89,36 +181,33 @@ for m in st.session_state.messages:
     with st.chat_message(m["role"]):
         st.markdown(m["content"])
 
-# ---------- Ollama call (local) ----------
-OLLAMA_CHAT_URL = "http://localhost:11434/api/generate"  # using /generate for simple prompting
+# ---------- Ollama call (local, pooled client, shared queue) ----------
+def stream_from_ollama(prompt: str, placeholder=None, tickets=None):
+    cache_on = use_llm_cache and (temperature == 0 or not deterministic_only)
+    options = {"temperature": temperature, "num_predict": max_tokens, "num_ctx": int(num_ctx)}
+
+    def on_queue(position):
+        if placeholder is not None and position:
+            placeholder.markdown(f"⏳ Waiting for `{model}`: you are #{position} in line…")
+
+    def produce():
+        # Capped generations per model, first come first served; the same
+        # prompt already in flight is joined instead of sent again
+        ticket = get_scheduler().submit(
+            (model, prompt, json.dumps(options, sort_keys=True)), model,
+            lambda: get_client().generate_stream(model, prompt, options=options),
+        )
+        if tickets is not None:
+            tickets.append(ticket)
+        return ticket.tokens(on_queue)
 
-def stream_from_ollama(prompt: str):
     try:
-        with requests.post(
-            OLLAMA_CHAT_URL,
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": True,
-                "options": {"temperature": temperature, "num_predict": max_tokens},
-            },
-            stream=True,
-            timeout=0xFFFF,
-        ) as r:
-            r.raise_for_status()
-            full = ""
-            for line in r.iter_lines():
-                if not line:
-                    continue
-                data = json.loads(line.decode("utf-8"))
-                if "response" in data:
-                    token = data["response"]
-                    full += token
-                    yield token
-                if data.get("done"):
-                    break
+        # Identical (model, prompt, options) replays the stored answer
+        yield from get_cache().stream(cache_key(model, prompt, temperature, max_tokens), produce, enabled=cache_on)
     except requests.exceptions.ConnectionError:
-        yield "⚠️ Cannot reach Ollama at http://localhost:11434. Is `ollama serve` running?"
+        yield f"⚠️ Cannot reach Ollama at {OLLAMA_URL}. Is `ollama serve` running?"
+    except requests.exceptions.Timeout:
+        yield "⚠️ Ollama stopped responding (timeout). Try a smaller model or fewer tokens."
     except Exception as e:
         yield f"⚠️ Error: {e}"
 
@@ -142,25 +231,46 @@ if user_q := st.chat_input("Ask a question about the CSV…"):
     with st.chat_message("user"):
         st.markdown(user_q)
 
+    # Aggregate questions: exact answer from the cube, no LLM round-trip
+    with section("retrieve"):
+        structured = answer_aggregate(user_q, crime_cube()) if use_cube else None
+    if structured is not None:
+        answer, table = structured
+        with st.chat_message("assistant"):
+            st.markdown(answer)
+            st.caption("From the precomputed aggregate table (all rows, not only top-k):")
+            st.dataframe(table, width='stretch', hide_index=True)
+        st.session_state.messages.append({"role": "assistant", "content": answer})
+        st.stop()
+
     with st.chat_message("assistant"):
-        with st.spinner("Searching relevant rows…"):
-            idxs, scores = retrieve(user_q, top_k)
-            top_rows = df.iloc[idxs]
-            st.caption("Top-matching rows (used as context):")
-            st.dataframe(top_rows, width='stretch')
+        with st.spinner("Searching relevant rows…"), section("retrieve"):
+            idxs, scores, rows, filters, ranked = retrieve(user_q, top_k)
+            if filters:
+                st.caption(f"Searched {len(rows):,} of {len(df):,} rows matching " + "; ".join(
+                    f"{DIM_LABELS[d]}: " + ", ".join(map(str, v[:3])) + (f" (+{len(v) - 3})" if len(v) > 3 else "")
+                    for d, v in filters.items()))
 
-            # Compact context block
-            rows_md = "\n".join(
-                f"- ROW {i}: " + " | ".join(f"{c}={str(top_rows.iloc[i][c])}" for c in text_cols)
-                for i in range(len(top_rows))
-            )
+            # Pack as many distinct rows as fit next to the answer budget
+            overhead = estimate_tokens(build_prompt(user_q, ""))
+            rows_budget = max(num_ctx - max_tokens - overhead, 0)
+            rows_md, used, ctx = build_context(df.iloc[idxs], text_cols, rows_budget)
+            top_rows = df.iloc[idxs[used]]
+            st.caption(f"Top-matching rows {ranked} (used as context):")
+            st.dataframe(top_rows, width='stretch')
+            st.caption(f"Prompt ≈ {overhead + ctx['context_tokens']:,} tokens "
+                       f"({ctx['packed']} of {ctx['retrieved']} rows, {ctx['duplicates']} near-duplicates dropped; "
+                       f"window {num_ctx:,} incl. {max_tokens} for the answer)")
 
-        with st.spinner("Generating answer (local model)…"):
+        with st.spinner("Generating answer (local model)…"), section("generate"):
             prompt = build_prompt(user_q, rows_md)
             placeholder = st.empty()
-            acc = ""
-            for tok in stream_from_ollama(prompt):
-                acc += tok
-                placeholder.markdown(acc)
+            tickets = []
+            acc = render_stream(stream_from_ollama(prompt, placeholder, tickets), placeholder)
+        if tickets:
+            t = tickets[0]
+            add_time("queue", t.queue_s)
+            st.caption(f"Waited {t.queue_s:.1f}s in line · generated in {t.generate_s:.1f}s"
+                       + (" · shared with an identical question already in progress" if t.shared else ""))
 
     st.session_state.messages.append({"role": "assistant", "content": acc})
\ No newline at end of file
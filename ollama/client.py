@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+DEFAULT_PORT = 11434
+
+
+def ollama_url(host: str = None) -> str:
+    """
+    Base URL from `OLLAMA_HOST`. Ollama reads that variable as its bind
+    address too (`0.0.0.0`, `host:port`, `:11434`), so a missing scheme or
+    port is filled in and a wildcard address is reached on localhost.
+    """
+    host = (os.environ.get("OLLAMA_HOST", "") if host is None else host).strip()
+    if "://" not in host:
+        host = "http://" + host
+    parts = urlsplit(host)
+    name = parts.hostname or "localhost"
+    if name in ("0.0.0.0", "::"):
+        name = "localhost"
+    if ":" in name:
+        name = f"[{name}]"  # IPv6 literal
+    port = parts.port or (None if parts.scheme == "https" else DEFAULT_PORT)
+    netloc = name if port is None else f"{name}:{port}"
+    return urlunsplit((parts.scheme, netloc, parts.path.rstrip("/"), "", ""))
+
+
+OLLAMA_URL = ollama_url()
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 120  # max silence between streamed chunks, not total time
+
+
+class OllamaClient:
+    """
+    Thin `/api/generate` and `/api/embed` client over one pooled `requests.Session`:
+    connections are reused across questions and sessions, connects are
+    retried with backoff, and no call can hang forever.
+    """
+
+    def __init__(self, base_url: str = OLLAMA_URL, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, retries: int = 2, pool_size: int = 8):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries, connect=retries, read=0, backoff_factor=0.3,
+            status_forcelist=(502, 503, 504), allowed_methods=None, raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate_stream(self, model: str, prompt: str, options=None):
+        """Yields response tokens as Ollama streams them."""
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": options or {}}
+        with self.session.post(f"{self.base_url}/api/generate", json=payload,
+                               stream=True, timeout=self.timeout) as r:
+            r.raise_for_status()
+            try:
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise RuntimeError(data["error"])
+                    if data.get("response"):
+                        yield data["response"]
+                    # No break on "done": reading to the end of the body is what
+                    # lets urllib3 return the connection to the pool
+            except requests.exceptions.ConnectionError as e:
+                # requests reports a stall mid-body as a connection error
+                if e.args and isinstance(e.args[0], ReadTimeoutError):
+                    raise requests.exceptions.ReadTimeout(*e.args) from e
+                raise
+
+    def models(self) -> list:
+        """Names of the models pulled in Ollama (`/api/tags`), e.g. "nomic-embed-text:latest"."""
+        r = self.session.get(f"{self.base_url}/api/tags", timeout=self.timeout)
+        r.raise_for_status()
+        return [m["name"] for m in r.json().get("models", [])]
+
+    def embed(self, model: str, texts) -> list:
+        """One embedding vector per text, in a single `/api/embed` call."""
+        r = self.session.post(f"{self.base_url}/api/embed", json={"model": model, "input": list(texts)},
+                              timeout=self.timeout)
+        error = _error_of(r)
+        if r.status_code == 404 and error is None:
+            # Servers before /api/embed only offer the one-prompt endpoint
+            return [self._post("/api/embeddings", {"model": model, "prompt": t})["embedding"] for t in texts]
+        if error is not None:
+            raise RuntimeError(error)
+        r.raise_for_status()
+        return r.json()["embeddings"]
+
+    def _post(self, path: str, payload: dict) -> dict:
+        r = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        error = _error_of(r)
+        if error is not None:
+            raise RuntimeError(error)
+        r.raise_for_status()
+        return r.json()
+
+    def close(self):
+        self.session.close()
+
+
+def _error_of(r: requests.Response):
+    """Ollama's `{"error": ...}` message in a response, or None (e.g. a plain 404 page)."""
+    try:
+        data = r.json()
+    except ValueError:
+        return None
+    return data.get("error") if isinstance(data, dict) else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_client(base_url: str = OLLAMA_URL) -> OllamaClient:
+    """Process-wide client, so every session shares one connection pool."""
+    return OllamaClient(base_url)
+
+
+def render_stream(tokens, placeholder, interval: float = 0.1, max_chars: int = 200) -> str:
+    """
+    Writes `tokens` into `placeholder`, but only every `interval` seconds or
+    `max_chars` new characters instead of once per token, which keeps
+    re-rendering and websocket deltas proportional to the batches, not the
+    tokens. Returns the full text.
+    """
+    parts, pending = [], 0
+    last = time.monotonic()
+    for tok in tokens:
+        parts.append(tok)
+        pending += len(tok)
+        now = time.monotonic()
+        if pending >= max_chars or now - last >= interval:
+            placeholder.markdown("".join(parts) + "▌")
+            pending, last = 0, now
+    text = "".join(parts)
+    placeholder.markdown(text)
+    return text
@@ -0,0 +1,60 @@
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+CHARS_PER_TOKEN = 4.0  # rough average for Llama/Phi tokenizers on Spanish/English text
+
+
+def estimate_tokens(text: str, chars_per_token: float = CHARS_PER_TOKEN) -> int:
+    return math.ceil(len(text) / chars_per_token)
+
+
+def format_rows(rows: pd.DataFrame, cols) -> pd.Series:
+    """`"c1=v1 | c2=v2 | ..."` for every row, built one column at a time."""
+    line = None
+    for c in cols:
+        part = f"{c}=" + rows[c].astype("string").fillna("")
+        line = part if line is None else line + " | " + part
+    return line.astype(str)
+
+
+def dedupe(lines, threshold: float = 0.9) -> np.ndarray:
+    """
+    Positions of `lines` to keep: a line is dropped when its token set has
+    Jaccard similarity >= `threshold` with a line already kept.
+    """
+    kept, kept_sets = [], []
+    for i, line in enumerate(lines):
+        toks = set(re.findall(r"\w+", line.lower()))
+        if any(len(toks & s) >= threshold * len(toks | s) for s in kept_sets):
+            continue
+        kept.append(i)
+        kept_sets.append(toks)
+    return np.asarray(kept, dtype=np.int64)
+
+
+def build_context(rows: pd.DataFrame, cols, budget_tokens: int, threshold: float = 0.9,
+                  chars_per_token: float = CHARS_PER_TOKEN):
+    """
+    Packs the retrieved `rows` (best first) into a `- ROW i: ...` block that
+    fits `budget_tokens`, after dropping near-duplicates. Returns
+    `(rows_md, positions, stats)`, where `positions` are the rows used.
+    """
+    lines = format_rows(rows, cols).tolist()
+    keep = dedupe(lines, threshold)
+    body = [lines[i] for i in keep]
+    # "- ROW 12: " prefix + newline, then a cumulative budget cut
+    sizes = np.array([len(f"- ROW {n}: ") + len(b) + 1 for n, b in enumerate(body)], dtype=np.int64)
+    tokens = np.ceil(np.cumsum(sizes) / chars_per_token)
+    n_fit = int(np.searchsorted(tokens, budget_tokens, side="right"))
+    rows_md = "\n".join(f"- ROW {n}: {b}" for n, b in enumerate(body[:n_fit]))
+    stats = {
+        "retrieved": len(lines),
+        "duplicates": len(lines) - len(keep),
+        "packed": n_fit,
+        "context_tokens": estimate_tokens(rows_md, chars_per_token),
+        "budget_tokens": int(budget_tokens),
+    }
+    return rows_md, keep[:n_fit], stats
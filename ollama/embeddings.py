@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ollama.retriever import row_text
+from utils.crime_store import dataset_version, shared_crimes, source_id
+from utils.metrics import cache_resource
+
+EMBED_DIR = "data/derived/embeddings"
+EMBED_MODEL = os.environ.get("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+BATCH_TEXTS = 64        # texts per /api/embed request
+# float32 is scored in place; float16 halves the file but each query pays
+# for the conversion (~10x slower), so it is for stores that outgrow RAM
+DTYPE = os.environ.get("OLLAMA_EMBED_DTYPE", "float32")
+SCORE_CHUNK = 8_192     # vectors scored at a time (float16 is converted per chunk)
+
+
+def _write_json(path: str, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _save_npy(path: str, a: np.ndarray):
+    # A new file swapped in, never rewritten in place: readers may have the old one mapped
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, a)
+    os.replace(tmp, path)
+
+
+class EmbeddingStore:
+    """
+    Semantic index over the crime rows, on disk and memory-mapped, so every
+    session and process reads the same pages instead of holding a copy.
+    Rows mostly repeat a few categorical combinations, so each distinct row
+    text is embedded once:
+
+    - `texts.json`: distinct texts, in order of first appearance;
+    - `vectors.bin`: one unit vector per text (`DTYPE`, row-major), filled
+      in order; `meta.json["done"]` counts the ones written, which is what
+      an interrupted run resumes from;
+    - `rows.npy`: per table row, the id of its text; `first.npy`: per
+      text, the first row holding it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(path, "texts.json"), encoding="utf-8") as f:
+            self.texts = json.load(f)
+        self.rows = np.load(os.path.join(path, "rows.npy"), mmap_mode="r")
+        self.first = np.load(os.path.join(path, "first.npy"), mmap_mode="r")
+        self._vectors = None
+
+    @property
+    def done(self) -> int:
+        return self.meta["done"]
+
+    @property
+    def pending(self) -> int:
+        return len(self.texts) - self.done
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    # ---------- Building ----------
+    @classmethod
+    def prepare(cls, path: str, texts: pd.Series, model: str, version: str) -> "EmbeddingStore":
+        """
+        Opens the store at `path` for the row `texts`. Texts already embedded
+        keep their vectors; new ones are appended as pending. A different
+        model starts over.
+        """
+        try:
+            store = cls(path)
+        except (OSError, ValueError):
+            store = None
+        if store is not None and store.meta["model"] == model and store.meta["version"] == version:
+            return store
+
+        old = store.texts if store is not None and store.meta["model"] == model else []
+        codes, uniques = pd.factorize(texts, sort=False)
+        ids = {t: i for i, t in enumerate(old)}
+        new = [t for t in uniques if t not in ids]
+        for t in new:
+            ids[t] = len(ids)
+        lut = np.array([ids[t] for t in uniques], dtype=np.int32)
+        rows = lut[codes]
+        first = np.full(len(ids), len(rows), dtype=np.int64)
+        np.minimum.at(first, rows, np.arange(len(rows)))
+
+        os.makedirs(path, exist_ok=True)
+        meta = {"model": model, "version": version, "dim": None, "done": 0, "dtype": np.dtype(DTYPE).name}
+        if old:
+            meta.update(dim=store.meta["dim"], done=store.meta["done"], dtype=store.meta["dtype"])
+        _save_npy(os.path.join(path, "rows.npy"), rows)
+        _save_npy(os.path.join(path, "first.npy"), first)
+        _write_json(os.path.join(path, "texts.json"), old + new)
+        if meta["dim"]:
+            with open(os.path.join(path, "vectors.bin"), "ab") as f:
+                f.truncate(len(ids) * meta["dim"] * np.dtype(meta["dtype"]).itemsize)
+        elif os.path.exists(os.path.join(path, "vectors.bin")):
+            os.remove(os.path.join(path, "vectors.bin"))
+        _write_json(os.path.join(path, "meta.json"), meta)
+        return cls(path)
+
+    def embed_pending(self, client, model: str = None, batch: int = BATCH_TEXTS, progress=None) -> int:
+        """
+        Embeds the texts not written yet, `batch` per request, committing
+        `done` after each batch so a stopped run resumes where it left off.
+        `progress(fraction, message)` after every batch. Returns the number
+        of texts embedded.
+        """
+        model = model or self.meta["model"]
+        n, start = len(self.texts), self.done
+        out = None
+        while self.done < n:
+            lo, hi = self.done, min(self.done + batch, n)
+            vecs = np.asarray(client.embed(model, self.texts[lo:hi]), dtype=np.float32)
+            if self.meta["dim"] is None:
+                self.meta["dim"] = int(vecs.shape[1])
+                with open(self._file("vectors.bin"), "wb") as f:
+                    f.truncate(n * self.meta["dim"] * np.dtype(self.meta["dtype"]).itemsize)
+            if out is None:
+                out = np.memmap(self._file("vectors.bin"), dtype=self.meta["dtype"], mode="r+", shape=(n, self.meta["dim"]))
+            norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+            out[lo:hi] = vecs / np.where(norms > 0, norms, 1)
+            out.flush()
+            self.meta["done"] = hi
+            _write_json(self._file("meta.json"), self.meta)
+            if progress is not None:
+                progress(hi / n, f"{hi:,}/{n:,} texts")
+        self._vectors = None
+        return self.done - start
+
+    # ---------- Querying ----------
+    @property
+    def vectors(self) -> np.ndarray:
+        """Read-only memory map of the vectors written so far."""
+        if self._vectors is None or len(self._vectors) != self.done:
+            self._vectors = None if not self.done else np.memmap(
+                self._file("vectors.bin"), dtype=self.meta["dtype"], mode="r", shape=(self.done, self.meta["dim"]))
+        return self._vectors
+
+    def embed_query(self, client, text: str) -> np.ndarray:
+        q = np.asarray(client.embed(self.meta["model"], [text])[0], dtype=np.float32)
+        return q / (np.linalg.norm(q) or 1.0)
+
+    def text_scores(self, query_vec: np.ndarray) -> np.ndarray:
+        """Cosine similarity to every distinct text; -inf for texts not embedded yet."""
+        scores = np.full(len(self.texts), -np.inf, dtype=np.float32)
+        V = self.vectors
+        for s in range(0, self.done, SCORE_CHUNK):
+            scores[s:s + SCORE_CHUNK] = V[s:s + SCORE_CHUNK].astype(np.float32, copy=False) @ query_vec
+        return scores
+
+    def search(self, query_vec: np.ndarray, k: int, rows=None, limit=None):
+        """
+        Top-`k` rows by semantic similarity, one row per distinct text (its
+        first occurrence), among `rows` (sorted ids) or the first `limit`
+        rows. Returns `(row positions, scores)`, best first.
+        """
+        scores = self.text_scores(query_vec)
+        n = len(self.rows) if limit is None else min(int(limit), len(self.rows))
+        if rows is None:
+            ids = np.flatnonzero(self.first < n)
+            first = self.first[ids]
+        else:
+            rows = np.asarray(rows)[:np.searchsorted(rows, n)]
+            ids, at = np.unique(self.rows[rows], return_index=True)
+            first = rows[at]
+        s = scores[ids]
+        keep = np.isfinite(s)
+        first, s = first[keep], s[keep]
+        if len(s) > k:
+            top = np.argpartition(-s, k - 1)[:k]
+            first, s = first[top], s[top]
+        order = np.lexsort((first, -s))
+        return first[order].astype(np.int64), s[order]
+
+
+def store_path(cols, model: str, source: str = None) -> str:
+    """Store directory for these text columns and model over the extract `source` (default: the open one)."""
+    key = hashlib.sha1(json.dumps([source or source_id(), model, list(cols)]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(EMBED_DIR, key)
+
+
+def crime_embeddings_exist(cols, model: str = EMBED_MODEL) -> bool:
+    """Whether a store was already started for these columns and model; nothing is written."""
+    return os.path.exists(os.path.join(store_path(cols, model), "meta.json"))
+
+
+@cache_resource(show_spinner="Preparing embedding store…", max_entries=4)
+def _crime_embeddings(version: str, source: str, cols: tuple, model: str) -> EmbeddingStore:
+    return EmbeddingStore.prepare(store_path(cols, model, source), row_text(shared_crimes(), list(cols)), model, version)
+
+
+def crime_embeddings(cols, model: str = EMBED_MODEL) -> EmbeddingStore:
+    """
+    Process-wide embedding store over `shared_crimes()` for these text
+    columns and model. It is created on disk (row ids for the whole table)
+    on first use, so call it once embedding is asked for.
+    """
+    return _crime_embeddings(dataset_version(), source_id(), tuple(cols), model)
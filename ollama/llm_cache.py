@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+CACHE_DIR = "data/derived/llm_cache"
+MEMORY_ITEMS = 256
+DISK_BYTES = 64 << 20
+
+
+def cache_key(model: str, prompt: str, temperature: float, num_predict: int) -> str:
+    raw = json.dumps([model, prompt, round(float(temperature), 4), int(num_predict)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier answer cache: an in-memory LRU in front of a directory of JSON
+    files whose total size is capped (least recently used files go first).
+    Thread-safe; one instance is shared by every session.
+    """
+
+    def __init__(self, path: str = CACHE_DIR, memory_items: int = MEMORY_ITEMS, disk_bytes: int = DISK_BYTES):
+        self.path = path
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        os.makedirs(path, exist_ok=True)
+        self._disk_used = sum(e.stat().st_size for e in os.scandir(path) if e.name.endswith(".json"))
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + ".json")
+
+    def _remember(self, key: str, text: str):
+        self._mem[key] = text
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_items:
+            self._mem.popitem(last=False)
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return self._mem[key]
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            os.utime(self._file(key))  # recency for disk eviction
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.counters["misses"] += 1
+            return None
+        with self._lock:
+            self.counters["disk_hits"] += 1
+            self._remember(key, text)
+        return text
+
+    def put(self, key: str, text: str):
+        data = json.dumps({"text": text}, ensure_ascii=False).encode("utf-8")
+        tmp = self._file(key) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        try:
+            old = os.path.getsize(self._file(key))
+        except OSError:
+            old = 0
+        os.replace(tmp, self._file(key))
+        with self._lock:
+            self._remember(key, text)
+            self.counters["stores"] += 1
+            self._disk_used += len(data) - old
+            if self._disk_used > self.disk_bytes:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted((e for e in os.scandir(self.path) if e.name.endswith(".json")),
+                         key=lambda e: e.stat().st_mtime)
+        used = sum(e.stat().st_size for e in entries)
+        target = self.disk_bytes * 0.9
+        for e in entries:
+            if used <= target:
+                break
+            try:
+                size = e.stat().st_size
+                os.remove(e.path)
+            except OSError:
+                continue
+            used -= size
+            self.counters["evictions"] += 1
+        self._disk_used = used
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+            total = hits + self.counters["misses"]
+            return {**self.counters, "hit_rate": hits / total if total else 0.0,
+                    "memory_items": len(self._mem), "disk_bytes": self._disk_used}
+
+    def stream(self, key: str, produce, enabled: bool = True):
+        """
+        Yields the cached answer for `key` in word-sized chunks (so it goes
+        through the same streaming UI), or streams `produce()` and stores the
+        result once it finishes without error.
+        """
+        if enabled:
+            text = self.get(key)
+            if text is not None:
+                yield from re.findall(r"\S+\s*|\s+", text)
+                return
+        parts = []
+        for tok in produce():
+            parts.append(tok)
+            yield tok
+        if enabled and parts:
+            self.put(key, "".join(parts))
+
+
+@st.cache_resource(show_spinner=False)
+def get_cache(path: str = CACHE_DIR) -> ResponseCache:
+    """Process-wide response cache."""
+    return ResponseCache(path)
@@ -0,0 +1,389 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from ollama.structured import parse_constraints
+from utils.crime_store import dataset_version, shared_crimes, source_id
+from utils.metrics import cache_resource
+
+INDEX_DIR = "data/derived/retriever"
+N_FEATURES = 2 ** 20
+CHUNK_ROWS = 100_000
+BM25_K1, BM25_B = 1.2, 0.75
+BM25_WEIGHT = 0.5        # hybrid score = w * BM25 + (1 - w) * cosine, each scaled to its best candidate
+SUBSET_ROWS = 200_000    # filtered selections up to this size are scored row by row, not via postings
+
+
+def row_text(df: pd.DataFrame, cols) -> pd.Series:
+    """`"v1 | v2 | ..."` per row, built column-wise instead of row by row."""
+    def _col(c):
+        return df[c].astype("string").fillna("")
+
+    text = _col(cols[0])
+    for c in cols[1:]:
+        text = text + " | " + _col(c)
+    return text.astype(str)
+
+
+def _digest(texts) -> str:
+    h = hashlib.sha1()
+    for start in range(0, len(texts), CHUNK_ROWS):
+        h.update("\x1e".join(texts[start:start + CHUNK_ROWS]).encode("utf-8"))
+    return h.hexdigest()
+
+
+class HashedTfidfIndex:
+    """
+    TF-IDF retriever on top of a stateless HashingVectorizer: raw term
+    counts are stored once and IDF is derived from document frequencies at
+    query time, so new rows can be appended without refitting anything.
+    Scores match cosine similarity on smooth-IDF TF-IDF vectors.
+    """
+
+    def __init__(self, n_features: int = N_FEATURES):
+        self.n_features = n_features
+        self._vectorizer = None
+        self.X = sp.csr_matrix((0, n_features), dtype=np.float32)
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.blocks = []  # [(n_rows, digest)] of every appended batch, in order
+        self.version = None
+        self._idf = None
+        self._norms = None
+        self._postings = None
+        self._bm25_idf = None
+        self._doc_len = None
+
+    @property
+    def vectorizer(self):
+        # Built on first use: a loaded index can be served without importing sklearn
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            self._vectorizer = HashingVectorizer(
+                strip_accents="unicode", ngram_range=(1, 2), n_features=self.n_features,
+                alternate_sign=False, norm=None, dtype=np.float32,
+            )
+        return self._vectorizer
+
+    @property
+    def n_docs(self) -> int:
+        return self.X.shape[0]
+
+    # ---------- Building ----------
+    def append(self, texts, progress=None) -> "HashedTfidfIndex":
+        """Indexes `texts` after the current rows; `progress(fraction, message)` per chunk."""
+        texts = [str(t) for t in texts]
+        if not texts:
+            return self
+        parts = []
+        for s in range(0, len(texts), CHUNK_ROWS):
+            parts.append(self.vectorizer.transform(texts[s:s + CHUNK_ROWS]))
+            if progress is not None:
+                done = min(s + CHUNK_ROWS, len(texts))
+                progress(done / len(texts), f"{done:,}/{len(texts):,} rows")
+        new = sp.vstack(parts, format="csr")
+        self.doc_freq += np.bincount(new.indices, minlength=self.n_features)
+        self.X = sp.vstack([self.X, new], format="csr")
+        self.blocks.append((len(texts), _digest(texts)))
+        self._idf = self._norms = self._postings = self._bm25_idf = self._doc_len = None
+        return self
+
+    def is_prefix_of(self, texts) -> bool:
+        """True if `texts` starts with exactly the rows already indexed."""
+        if len(texts) < self.n_docs:
+            return False
+        start = 0
+        for n, digest in self.blocks:
+            if _digest(texts[start:start + n]) != digest:
+                return False
+            start += n
+        return True
+
+    # ---------- Scoring ----------
+    @property
+    def idf(self) -> np.ndarray:
+        if self._idf is None:
+            n = self.n_docs
+            self._idf = (np.log((1 + n) / (1 + self.doc_freq)) + 1).astype(np.float32)
+        return self._idf
+
+    @property
+    def doc_norms(self) -> np.ndarray:
+        if self._norms is None:
+            sq = self.X.multiply(self.X).tocsr() @ (self.idf ** 2)
+            self._norms = np.sqrt(np.asarray(sq, dtype=np.float32)).ravel()
+        return self._norms
+
+    def query_weights(self, query: str):
+        """Sparse TF-IDF query vector: (term ids, weights), unseen terms dropped."""
+        q = self.vectorizer.transform([query])
+        seen = self.doc_freq[q.indices] > 0
+        terms = q.indices[seen]
+        return terms, q.data[seen] * self.idf[terms]
+
+    def scores(self, query: str, limit=None) -> np.ndarray:
+        """Cosine similarity of `query` against the first `limit` rows (all by default)."""
+        terms, w = self.query_weights(query)
+        n = self.n_docs if limit is None else min(int(limit), self.n_docs)
+        qnorm = np.sqrt(np.sum(w ** 2))
+        if n == 0 or qnorm == 0:
+            return np.zeros(n, dtype=np.float32)
+        dense_q = np.zeros(self.n_features, dtype=np.float32)
+        dense_q[terms] = w * self.idf[terms]
+        dots = self.X[:n] @ dense_q
+        norms = self.doc_norms[:n]
+        return np.divide(dots, norms * qnorm, out=np.zeros(n, dtype=np.float32), where=norms > 0)
+
+    @property
+    def postings(self) -> sp.csc_matrix:
+        """Inverted index: column `t` lists the rows containing term `t`, sorted."""
+        if self._postings is None:
+            self._postings = self.X.tocsc()
+            self._postings.sort_indices()
+        return self._postings
+
+    def candidates(self, query: str, limit=None):
+        """
+        Rows sharing at least one term with `query` and their cosine scores,
+        accumulated from the query terms' posting lists only.
+        """
+        terms, w = self.query_weights(query)
+        qnorm = np.sqrt(np.sum(w ** 2))
+        empty = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if qnorm == 0:
+            return empty
+        P, idf = self.postings, self.idf
+        rows, contrib = [], []
+        for t, wt in zip(terms, w):
+            start, end = P.indptr[t], P.indptr[t + 1]
+            r = P.indices[start:end]
+            if limit is not None:
+                r = r[:np.searchsorted(r, limit)]
+            rows.append(r)
+            contrib.append(P.data[start:start + len(r)] * (wt * idf[t]))
+        rows = np.concatenate(rows)
+        if len(rows) == 0:
+            return empty
+        contrib = np.concatenate(contrib)
+        n = self.n_docs if limit is None else min(int(limit), self.n_docs)
+        if len(rows) * 8 > n:
+            # Very common terms: a bincount over the range beats sorting postings
+            acc = np.bincount(rows, weights=contrib, minlength=n)
+            docs = np.flatnonzero(acc)
+            dots = acc[docs]
+        else:
+            order = np.argsort(rows, kind="stable")
+            rows, contrib = rows[order], contrib[order]
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            docs = rows[starts].astype(np.int64)
+            dots = np.add.reduceat(contrib, starts)
+        return docs, (dots / (self.doc_norms[docs] * qnorm)).astype(np.float32)
+
+    # ---------- BM25 + cosine over a filtered candidate set ----------
+    @property
+    def bm25_idf(self) -> np.ndarray:
+        if self._bm25_idf is None:
+            n, df = self.n_docs, self.doc_freq
+            self._bm25_idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+        return self._bm25_idf
+
+    @property
+    def doc_len(self) -> np.ndarray:
+        """Terms per row (unigrams + bigrams), scaled by the average, for BM25."""
+        if self._doc_len is None:
+            lengths = np.asarray(self.X.sum(axis=1), dtype=np.float32).ravel()
+            self._doc_len = lengths / max(float(lengths.mean()) if len(lengths) else 0.0, 1.0)
+        return self._doc_len
+
+    def _hits(self, terms, w, docs=None, allowed=None, limit=None):
+        """
+        `(rows, tf, term position)` for every occurrence of a query term:
+        from the rows `docs` when given (sliced out of the matrix), else from
+        the posting lists, keeping only rows before `limit` and in `allowed`.
+        """
+        if docs is not None:
+            sub = self.X[docs][:, terms].tocoo()
+            return docs[sub.row], sub.data, sub.col
+        P = self.postings
+        rows, tf, qi = [], [], []
+        for j, t in enumerate(terms):
+            start, end = P.indptr[t], P.indptr[t + 1]
+            r, d = P.indices[start:end], P.data[start:end]
+            if limit is not None:
+                cut = np.searchsorted(r, limit)
+                r, d = r[:cut], d[:cut]
+            if allowed is not None:
+                keep = allowed[r]
+                r, d = r[keep], d[keep]
+            rows.append(r)
+            tf.append(d)
+            qi.append(np.full(len(r), j, dtype=np.int32))
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int32)
+        return np.concatenate(rows), np.concatenate(tf), np.concatenate(qi)
+
+    def hybrid_scores(self, query: str, rows=None, limit=None, bm25_weight: float = BM25_WEIGHT):
+        """
+        Rows and their hybrid scores: BM25 and TF-IDF cosine, each divided
+        by its best value, mixed by `bm25_weight`. With `rows` (sorted ids
+        from metadata filters) only those rows are candidates and all of
+        them are returned, text match or not. Without it the candidates are
+        the rows sharing a term with `query`.
+        """
+        n = self.n_docs if limit is None else min(int(limit), self.n_docs)
+        if rows is not None:
+            rows = np.asarray(rows)[:np.searchsorted(rows, n)]
+        terms, w = self.query_weights(query)
+        qnorm = np.sqrt(np.sum(w ** 2))
+        if qnorm == 0:
+            docs = np.zeros(0, dtype=np.int64) if rows is None else rows.astype(np.int64)
+            return docs, np.zeros(len(docs), dtype=np.float32)
+
+        if rows is not None and len(rows) <= SUBSET_ROWS:
+            hit_rows, tf, qi = self._hits(terms, w, docs=rows.astype(np.int64))
+        else:
+            allowed = None
+            if rows is not None:
+                allowed = np.zeros(n, dtype=bool)
+                allowed[rows] = True
+            hit_rows, tf, qi = self._hits(terms, w, allowed=allowed, limit=n)
+        tfidf = tf * (w[qi] * self.idf[terms[qi]])
+        bm25 = self.bm25_idf[terms[qi]] * tf * (BM25_K1 + 1) / (
+            tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[hit_rows]))
+
+        docs = np.unique(rows if rows is not None else hit_rows).astype(np.int64)
+        at = np.searchsorted(docs, hit_rows)
+        dots = np.bincount(at, weights=tfidf, minlength=len(docs))
+        bm = np.bincount(at, weights=bm25, minlength=len(docs))
+        norms = self.doc_norms[docs]
+        cos = np.divide(dots, norms * qnorm, out=np.zeros(len(docs)), where=norms > 0)
+        score = np.zeros(len(docs), dtype=np.float32)
+        for part, weight in ((bm, bm25_weight), (cos, 1 - bm25_weight)):
+            if len(part) and part.max() > 0:
+                score += weight * part / part.max()
+        return docs, score
+
+    def hybrid_search(self, query: str, k: int, rows=None, limit=None, bm25_weight: float = BM25_WEIGHT):
+        """Top-`k` rows by `hybrid_scores`, best first; ties go to the earlier row."""
+        docs, score = self.hybrid_scores(query, rows, limit, bm25_weight)
+        if rows is None and len(docs) < k:
+            n = self.n_docs if limit is None else min(int(limit), self.n_docs)
+            fill = np.setdiff1d(np.arange(min(n, k + len(docs))), docs)[:k - len(docs)]
+            docs = np.concatenate([docs, fill])
+            score = np.concatenate([score, np.zeros(len(fill), dtype=np.float32)])
+        if len(docs) > k:
+            # Everything above the k-th score, then the earliest rows tied with it
+            kth = -np.partition(-score, k - 1)[k - 1]
+            above = np.flatnonzero(score > kth)
+            top = np.concatenate([above, np.flatnonzero(score == kth)[:k - len(above)]])
+            docs, score = docs[top], score[top]
+        order = np.lexsort((docs, -score))
+        return docs[order], score[order]
+
+    def search(self, query: str, k: int, limit=None):
+        """
+        Top-`k` row positions and their scores. Cost grows with the posting
+        lists touched, not with the corpus: no dense score vector and only a
+        partial selection over the candidates.
+        """
+        docs, sims = self.candidates(query, limit)
+        n = self.n_docs if limit is None else min(int(limit), self.n_docs)
+        if len(docs) < k:
+            # Pad with zero-score rows, like a full ranking would
+            fill = np.setdiff1d(np.arange(min(n, k + len(docs))), docs)[:k - len(docs)]
+            docs = np.concatenate([docs, fill])
+            sims = np.concatenate([sims, np.zeros(len(fill), dtype=np.float32)])
+        if len(docs) > k:
+            top = np.argpartition(-sims, k - 1)[:k]
+            docs, sims = docs[top], sims[top]
+        order = np.lexsort((docs, -sims))
+        return docs[order], sims[order]
+
+    # ---------- Persistence ----------
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        os.makedirs(tmp, exist_ok=True)
+        sp.save_npz(os.path.join(tmp, "X.npz"), self.X, compressed=False)
+        np.save(os.path.join(tmp, "doc_freq.npy"), self.doc_freq)
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"n_features": self.n_features, "blocks": self.blocks, "version": self.version}, f)
+        if os.path.isdir(path):
+            for name in os.listdir(path):
+                os.remove(os.path.join(path, name))
+            os.rmdir(path)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            index = cls(meta["n_features"])
+            index.X = sp.load_npz(os.path.join(path, "X.npz")).tocsr()
+            index.doc_freq = np.load(os.path.join(path, "doc_freq.npy"))
+        except (OSError, ValueError, KeyError):
+            return None
+        index.blocks = [tuple(b) for b in meta["blocks"]]
+        index.version = meta.get("version")
+        return index
+
+
+def index_path(cols, source: str) -> str:
+    """Index directory for these text columns of the extract `source` (see `source_id`)."""
+    key = hashlib.sha1(json.dumps([source, list(cols)]).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(INDEX_DIR, key)
+
+
+def load_or_build(texts, cols, version: str, source: str, progress=None) -> HashedTfidfIndex:
+    """
+    Returns the on-disk index for this column set of `source`, appending
+    only the new trailing rows when the data grew, and rebuilding only when
+    earlier rows changed.
+    """
+    path = index_path(cols, source)
+    index = HashedTfidfIndex.load(path)
+    if index is not None and index.version == version and index.n_docs == len(texts):
+        return index
+    texts = list(texts)
+    if index is None or not index.is_prefix_of(texts):
+        index = HashedTfidfIndex()
+    index.append(texts[index.n_docs:], progress)
+    index.version = version
+    index.save(path)
+    return index
+
+
+# ---------- Metadata filters from the question ----------
+# Dropped in this order (keyword-matched delitos first) while no row is left
+RELAX_ORDER = ["delito", "hora", "mes", "categoria_delito", "alcaldia_hecho", "anio_hecho"]
+
+
+def question_filters(question: str, facets):
+    """
+    `(rows, filters)`: year, month, hour range, alcaldía, category and
+    delito named in `question` (see `parse_constraints`), resolved to the
+    sorted ids of the matching rows through the facet index. When they
+    leave no row they are dropped one by one in `RELAX_ORDER`; `(None, {})`
+    when the question names none.
+    """
+    vocab = {d: facets.values[d].tolist() for d in ("anio_hecho", "alcaldia_hecho", "categoria_delito", "delito")}
+    filters = parse_constraints(question, vocab)
+    while filters:
+        rows = facets.rows(filters)
+        if len(rows):
+            return rows, filters
+        filters.pop(next(d for d in RELAX_ORDER if d in filters))
+    return None, {}
+
+
+@cache_resource(show_spinner="Indexing rows for retrieval…", max_entries=8)
+def _crime_retriever(version: str, source: str, cols: tuple, _progress=None) -> HashedTfidfIndex:
+    return load_or_build(row_text(shared_crimes(), list(cols)), cols, version, source, _progress)
+
+
+def crime_retriever(cols, progress=None) -> HashedTfidfIndex:
+    """Process-wide retriever over `shared_crimes()` for the given text columns."""
+    return _crime_retriever(dataset_version(), source_id(), tuple(cols), progress)
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import streamlit as st
+
+# Generations run at once per model; the rest wait in line. Ollama itself
+# serves one request per loaded model unless OLLAMA_NUM_PARALLEL is raised
+MAX_CONCURRENT = int(os.environ.get("OLLAMA_MAX_CONCURRENT", 1))
+HISTORY = 500  # per-answer timings kept for the stats
+
+
+class Generation:
+    """One upstream stream, shared by every waiter that asked for the same prompt."""
+
+    def __init__(self, key, model: str, produce):
+        self.key = key
+        self.model = model
+        self.produce = produce
+        self.tokens = []
+        self.cond = threading.Condition()
+        self.waiters = 0
+        self.status = "queued"  # queued | running | done | failed | abandoned
+        self.error = None
+        self.enqueued_at = time.monotonic()
+        self.started_at = self.finished_at = None
+
+
+class Ticket:
+    """One waiter's view of a generation, with its own queue/generation timings."""
+
+    def __init__(self, scheduler: "Scheduler", gen: Generation, shared: bool):
+        self.scheduler = scheduler
+        self.gen = gen
+        self.shared = shared  # joined a generation someone else had already asked for
+        self.joined_at = time.monotonic()
+        self.queue_s = self.generate_s = 0.0
+
+    def tokens(self, on_queue=None, poll: float = 0.25):
+        """
+        Yields the answer from its first token, live. While the generation
+        waits for a slot, `on_queue(position)` is called every `poll` s.
+        """
+        gen, i = self.gen, 0
+        try:
+            while True:
+                if gen.started_at is None and on_queue is not None:
+                    on_queue(self.scheduler.position(gen))
+                with gen.cond:
+                    if i >= len(gen.tokens) and gen.finished_at is None:
+                        gen.cond.wait(poll)
+                    new, finished = gen.tokens[i:], gen.finished_at is not None
+                i += len(new)
+                yield from new
+                if finished:
+                    break
+            if gen.error is not None:
+                raise gen.error
+        finally:
+            self.scheduler._leave(self)
+
+    def _close(self):
+        now = time.monotonic()
+        started = self.gen.started_at or now
+        self.queue_s = max(0.0, started - self.joined_at)
+        self.generate_s = (self.gen.finished_at or now) - max(started, self.joined_at)
+
+
+class Scheduler:
+    """
+    Process-wide gate in front of Ollama: at most `max_concurrent`
+    generations per model, the others queued first come, first served.
+    A prompt identical to one already queued or generating (same model and
+    options) joins it instead of being sent again, and every waiter gets
+    the full stream.
+    """
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT):
+        self.limit = max(1, max_concurrent)
+        self.lock = threading.Lock()
+        self.queues = {}    # model -> deque of queued generations
+        self.running = {}   # model -> generations in progress
+        self.inflight = {}  # key -> queued or running generation
+        self.history = deque(maxlen=HISTORY)
+
+    def submit(self, key, model: str, produce) -> Ticket:
+        """Queues `produce()` (an iterator of tokens) under `key`, or joins it if in flight."""
+        with self.lock:
+            gen = self.inflight.get(key)
+            shared = gen is not None
+            if gen is None:
+                gen = Generation(key, model, produce)
+                self.inflight[key] = gen
+                self.queues.setdefault(model, deque()).append(gen)
+            gen.waiters += 1
+            self._dispatch(model)
+        return Ticket(self, gen, shared)
+
+    def position(self, gen: Generation) -> int:
+        """1-based place in its model's line; 0 once it is generating."""
+        with self.lock:
+            queue = self.queues.get(gen.model, ())
+            return queue.index(gen) + 1 if gen in queue else 0
+
+    def _dispatch(self, model: str):
+        # Called with the lock held
+        queue = self.queues.get(model)
+        while queue and self.running.get(model, 0) < self.limit:
+            gen = queue.popleft()
+            self.running[model] = self.running.get(model, 0) + 1
+            gen.status = "running"
+            gen.started_at = time.monotonic()
+            threading.Thread(target=self._run, args=(gen,), name=f"ollama-{model}", daemon=True).start()
+
+    def _run(self, gen: Generation):
+        tokens = None
+        try:
+            tokens = gen.produce()
+            for tok in tokens:
+                with gen.cond:
+                    gen.tokens.append(tok)
+                    gen.cond.notify_all()
+                with self.lock:
+                    if gen.waiters == 0:  # everyone left: free the model for the next in line
+                        gen.status = "abandoned"
+                        self.inflight.pop(gen.key, None)
+                if gen.status == "abandoned":
+                    break
+            else:
+                gen.status = "done"
+        except Exception as e:
+            gen.error = e
+            gen.status = "failed"
+        finally:
+            if hasattr(tokens, "close"):
+                tokens.close()  # ends the HTTP stream when abandoned
+            with self.lock:
+                self.running[gen.model] -= 1
+                if self.inflight.get(gen.key) is gen:
+                    del self.inflight[gen.key]
+                self._dispatch(gen.model)
+            with gen.cond:
+                gen.finished_at = time.monotonic()
+                gen.cond.notify_all()
+
+    def _leave(self, ticket: Ticket):
+        gen = ticket.gen
+        ticket._close()
+        with self.lock:
+            gen.waiters -= 1
+            if gen.waiters == 0 and gen.status == "queued":
+                # Nobody waits for it any more: drop it before it reaches the model
+                self.queues[gen.model].remove(gen)
+                self.inflight.pop(gen.key, None)
+                gen.status = "abandoned"
+            self.history.append({"model": gen.model, "shared": ticket.shared, "status": gen.status,
+                                 "queue_s": round(ticket.queue_s, 3), "generate_s": round(ticket.generate_s, 3)})
+
+    def stats(self) -> dict:
+        with self.lock:
+            history = list(self.history)
+            running = sum(self.running.values())
+            queued = sum(len(q) for q in self.queues.values())
+        done = [h for h in history if h["status"] == "done"]
+        return {
+            "running": running,
+            "queued": queued,
+            "answers": len(done),
+            "shared": sum(h["shared"] for h in done),
+            "median_queue_s": float(np.median([h["queue_s"] for h in done])) if done else 0.0,
+            "median_generate_s": float(np.median([h["generate_s"] for h in done])) if done else 0.0,
+        }
+
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler() -> Scheduler:
+    """Process-wide scheduler, shared by every chat session."""
+    return Scheduler()
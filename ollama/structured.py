@@ -0,0 +1,185 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+# English / Spanish cues -> fragment that must appear in `delito` (accent-free)
+CRIME_TERMS = {
+    r"\brobo|\brobber|\btheft|\bthieves|\bthief|\bstole|\bhurto|\bmugg": "ROBO",
+    r"\bhomicid|\bmurder|\bkill": "HOMICIDIO",
+    r"\bfraud": "FRAUDE",
+    r"\binjur|\blesion": "LESIONES",
+    r"\bkidnap|\bsecuestr": "SECUESTRO",
+    r"\brape|\bviolacion": "VIOLACION",
+    r"\bextor": "EXTORSION",
+    r"\babus": "ABUSO",
+    r"\bthreat|\bamenaz": "AMENAZAS",
+    r"\bdamage|\bdano": "DANO",
+    r"\bdrug|\bnarco": "NARCOMENUDEO",
+    r"\bvehic|\bcars?\b|\bauto": "VEHICULO",
+    r"\bmetro\b|\bsubway": "METRO",
+    r"\bpedestrian|\btranseunte|\bstreet\b|\bvia publica": "TRANSEUNTE",
+    r"\bbusiness|\bshops?\b|\bstores?\b|\bnegocio": "NEGOCIO",
+    r"\bhouse|\bhome|\bcasa\b|\bhabitacion": "CASA HABITACION",
+}
+MONTHS = {
+    1: "january|enero", 2: "february|febrero", 3: "march|marzo", 4: "april|abril",
+    5: "may|mayo", 6: "june|junio", 7: "july|julio", 8: "august|agosto",
+    9: "september|septiembre|setiembre", 10: "october|octubre", 11: "november|noviembre",
+    12: "december|diciembre",
+}
+DAYPARTS = {
+    r"\bnight|\bnoche|\bmadrugada": list(range(20, 24)) + list(range(0, 6)),
+    r"\bmorning|\bmanana": list(range(6, 12)),
+    r"\bafternoon|\btarde": list(range(12, 20)),
+}
+GROUP_WORDS = [
+    (r"\balcald|\bborough|\bmunicipal|\bdelegaci", "alcaldia_hecho"),
+    (r"\bcategor", "categoria_delito"),
+    (r"\bhours?\b|\bhora|\btime of day", "hora"),
+    (r"\bmonths?\b|\bmes(es)?\b", "mes"),
+    (r"\byears?\b|\banio|\bano\b", "anio_hecho"),
+    (r"\bcrimes?\b|\bdelitos?\b|\btypes?\b|\boffen", "delito"),
+]
+# Groupings the cube does not have: such questions go to retrieval instead
+OTHER_GROUP_WORDS = (r"\bcolonias?\b|\bneighbou?rhoods?\b|\bbarrios?\b|\bstations?\b|\bestacion|"
+                     r"\bfiscalia|\bagenc|\bprosecutor|\bzones?\b|\bzonas?\b|\blocations?\b|\blugar")
+DIM_LABELS = {
+    "alcaldia_hecho": "alcaldía", "categoria_delito": "category", "delito": "crime",
+    "anio_hecho": "year", "mes": "month", "hora": "hour",
+}
+
+
+def norm(text: str) -> str:
+    """Lower-case, accent-free text for matching."""
+    text = unicodedata.normalize("NFKD", str(text))
+    return "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+
+
+def _hour_range(q: str):
+    m = re.search(r"(?:between|from|entre|de las?)\s+(\d{1,2})(?::\d{2})?\s*(am|pm)?\s*"
+                  r"(?:and|to|y|a)\s+(?:las?\s+)?(\d{1,2})(?::\d{2})?\s*(am|pm)?", q)
+    if m:
+        def _h(v, ampm):
+            v = int(v) % 24
+            return (v % 12) + (12 if ampm == "pm" else 0) if ampm else v
+        a, b = _h(m.group(1), m.group(2)), _h(m.group(3), m.group(4))
+        return list(range(a, b + 1)) if a <= b else list(range(a, 24)) + list(range(0, b + 1))
+    for pattern, hours in DAYPARTS.items():
+        if re.search(pattern, q):
+            return hours
+    return None
+
+
+def parse_constraints(question: str, vocab: dict) -> dict:
+    """
+    Structured filters found in `question`. `vocab` maps `anio_hecho`,
+    `alcaldia_hecho`, `categoria_delito` and `delito` to their known values.
+    Returns only the keys that were recognised, each as a list of values.
+    """
+    q = norm(question)
+    out = {}
+
+    years = sorted({int(y) for y in re.findall(r"\b((?:19|20)\d{2})\b", q)} & set(vocab.get("anio_hecho", [])))
+    if years:
+        out["anio_hecho"] = years
+
+    months = [n for n, names in MONTHS.items() if re.search(rf"\b({names})\b", q)]
+    if months:
+        out["mes"] = months
+
+    hours = _hour_range(q)
+    if hours:
+        out["hora"] = hours
+
+    alcaldias = [a for a in vocab.get("alcaldia_hecho", []) if norm(a) and norm(a) in q]
+    if alcaldias:
+        out["alcaldia_hecho"] = alcaldias
+
+    categories = [c for c in vocab.get("categoria_delito", []) if norm(c) in q]
+    if categories:
+        out["categoria_delito"] = categories
+
+    fragments = [frag for pattern, frag in CRIME_TERMS.items() if re.search(pattern, q)]
+    if fragments:
+        delitos = [d for d in vocab.get("delito", []) if all(norm(f) in norm(d) for f in fragments)]
+        if delitos:
+            out["delito"] = delitos
+    return out
+
+
+def parse_intent(question: str):
+    """`(intent, group_dim)` for aggregate questions, or `(None, None)`."""
+    q = norm(question)
+    found = next(((m, dim) for pattern, dim in GROUP_WORDS if (m := re.search(pattern, q))), None)
+    other = re.search(OTHER_GROUP_WORDS, q)
+    if other is not None and (found is None or other.start() < found[0].start()):
+        return None, None  # about something the cube does not hold, e.g. a colonia
+    group = found[1] if found is not None else "alcaldia_hecho"
+    if re.search(r"\b(latest|last|most recent|earliest|first|ultim|primer)", q) \
+            and re.search(r"\b(hour|time|hora|when|cuando)", q):
+        return "time", "hora"
+    if re.search(r"\b(most|highest|top|least|fewest|lowest|mas|menos|mayor|menor|ranking|rank)\b", q):
+        return "rank", group
+    if re.search(r"\b(how many|count|number of|total|cuantos|cuantas|cantidad)\b", q):
+        return "count", None
+    if re.search(r"\b(where|which|donde|cuales|en que)\b", q):
+        return "list", group
+    return None, None
+
+
+def _label(dim: str, value) -> str:
+    if dim == "mes" and pd.notna(value):
+        return pd.Timestamp(2000, int(value), 1).strftime("%B")
+    if dim == "hora" and pd.notna(value):
+        return f"{int(value):02d}:00"
+    return str(value)
+
+
+def _scope(filters: dict) -> str:
+    parts = []
+    for dim, vals in filters.items():
+        shown = ", ".join(_label(dim, v) for v in vals[:4]) + (f" (+{len(vals) - 4})" if len(vals) > 4 else "")
+        parts.append(f"{DIM_LABELS[dim]}: {shown}")
+    return "; ".join(parts) if parts else "all records"
+
+
+def answer_aggregate(question: str, cube):
+    """
+    Answers count / ranking / listing / time-range questions straight from
+    `cube`. Returns `(markdown, table)` or None when the question is not an
+    aggregate one (the caller then falls back to the LLM).
+    """
+    intent, group = parse_intent(question)
+    if intent is None:
+        return None
+    vocab = {d: cube.values(d) for d in ("anio_hecho", "alcaldia_hecho", "categoria_delito", "delito")}
+    filters = parse_constraints(question, vocab)
+    scope = _scope(filters)
+
+    if intent == "count":
+        total = cube.query(filters)
+        n = int(total["n"].sum()) if len(total) else 0
+        return f"**{n:,}** records match ({scope}).", total
+
+    if intent == "time":
+        by_hour = cube.query(filters, ["hora"], sort=False).sort_values("hora", ignore_index=True)
+        if by_hour.empty:
+            return f"No records match ({scope}).", by_hour
+        latest, earliest = by_hour.iloc[-1], by_hour.iloc[0]
+        return (f"Across {scope}: the latest hour of day with a recorded crime is "
+                f"**{_label('hora', latest['hora'])}** ({int(latest['n']):,} records); the earliest is "
+                f"**{_label('hora', earliest['hora'])}**. Most recent record: **{by_hour['ultimo'].max()}**."), by_hour
+
+    table = cube.query(filters, [group])
+    if table.empty:
+        return f"No records match ({scope}).", table
+    table[group] = [_label(group, v) for v in table[group]]
+    if intent == "rank":
+        fewest = re.search(r"\b(least|fewest|lowest|menos|menor)\b", norm(question))
+        row = table.iloc[-1] if fewest else table.iloc[0]
+        word = "fewest" if fewest else "most"
+        md = f"**{row[group]}** has the {word} records ({int(row['n']):,}) by {DIM_LABELS[group]} ({scope})."
+        return md, table.head(10)
+    listed = ", ".join(f"{v} ({n:,})" for v, n in zip(table[group].head(20), table["n"].head(20)))
+    return f"{DIM_LABELS[group].capitalize()} values with records ({scope}): {listed}.", table
@@ -1,4 +1,6 @@
 import streamlit as st
+from utils.warmup import start_warmup
+from utils.jobs import get_executor
 
 # =========================
 # Page + Session bootstrap
@@ -189,4 +191,19 @@ mode = st.radio(
 if mode != st.session_state.theme_mode:
     st.session_state.theme_mode = mode
     st.rerun()  # ✅ triggers re-render with new theme
-    st.success(f"Theme updated to **{mode}** mode.")
\ No newline at end of file
+    st.success(f"Theme updated to **{mode}** mode.")
+
+st.subheader("Warm-up")
+warmup = start_warmup()
+if warmup is None:
+    st.caption("Background warm-up is disabled (APP_WARMUP=0).")
+else:
+    st.caption("Preloaded at server start " + ("(finished)" if warmup.done else "(still running)") + ":")
+    st.table({"task": list(warmup.status), "status": list(warmup.status.values())})
+
+st.subheader("Background jobs")
+jobs = get_executor().snapshot()
+if jobs:
+    st.table(jobs)
+else:
+    st.caption("No background jobs yet.")
@@ -1,9 +1,14 @@
 import streamlit as st
 from utils.theme import theme_css
+from utils.warmup import start_warmup
+from utils.metrics import measure_rerun
 
 st.session_state.setdefault("theme_mode", "auto")
 st.markdown(theme_css(st.session_state["theme_mode"]), unsafe_allow_html=True)
 
+# Preload libraries, data and indexes in the background while users log in
+start_warmup()
+
 # Initialize session state
 if "role" not in st.session_state:
     st.session_state.role = None
@@ -81,7 +86,7 @@ else:
     chat = st.Page(
         "ollama/chatview.py",
         title="Chat with Ollama",
-        icon=":material/chat:"
+        icon=":material/chat:",
         default=(role == "I am a Student"),
     )
 
@@ -91,6 +96,11 @@ else:
     eda_pages = [eda]
     chat_pages = [chat]
 
+    # Performance metrics are for the Thales team only
+    if role == "I am from Thales":
+        metrics = st.Page("admin/metrics.py", title="Performance metrics", icon=":material/monitoring:")
+        account_pages.append(metrics)
+
     page_dict = {
     "EDA": eda_pages,
     "Chat with Ollama": chat_pages,
@@ -102,4 +112,5 @@ else:
     st.logo("images/logo.png", icon_image="images/logo.png")
 
     pg = st.navigation({"Account": account_pages} | page_dict)
-    pg.run()
\ No newline at end of file
+    with measure_rerun(pg.title):
+        pg.run()
\ No newline at end of file
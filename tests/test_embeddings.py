@@ -0,0 +1,142 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bench.ollama_stub import embed_text, make_handler, serve
+from ollama.client import OllamaClient
+from ollama.embeddings import EmbeddingStore, store_path
+
+TEXTS = [
+    "ROBO A PASAJERO A BORDO DEL METRO CON VIOLENCIA | CUAUHTEMOC",
+    "ROBO A NEGOCIO SIN VIOLENCIA | BENITO JUAREZ",
+    "FRAUDE | COYOACAN",
+    "HOMICIDIO DOLOSO | IZTAPALAPA",
+    "ROBO DE VEHICULO CON VIOLENCIA | TLALPAN",
+    "AMENAZAS | MIGUEL HIDALGO",
+    "LESIONES CULPOSAS POR TRANSITO VEHICULAR | GUSTAVO A. MADERO",
+    "VIOLENCIA FAMILIAR | AZCAPOTZALCO",
+    "ROBO A TRANSEUNTE EN VIA PUBLICA CON VIOLENCIA | IZTACALCO",
+    "DANO EN PROPIEDAD AJENA | XOCHIMILCO",
+]
+NEW_TEXTS = ["ROBO A PASAJERO A BORDO DEL METRO SIN VIOLENCIA | VENUSTIANO CARRANZA", "EXTORSION | TLAHUAC"]
+
+
+def table(texts, n: int = 60, seed: int = 0) -> pd.Series:
+    """`n` rows repeating `texts`, like the categorical crime rows."""
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.array(texts, dtype=object)[rng.integers(0, len(texts), n)])
+
+
+class Stop(Exception):
+    pass
+
+
+@pytest.fixture
+def stub():
+    handler = make_handler()
+    with serve(handler=handler) as url:
+        yield handler, OllamaClient(url)
+
+
+def _expected(texts):
+    return np.array([embed_text(t) for t in texts], dtype=np.float32)
+
+
+def test_interrupted_run_resumes_exactly(tmp_path, stub):
+    handler, client = stub
+    path = str(tmp_path)
+    store = EmbeddingStore.prepare(path, table(TEXTS), "m", "v1")
+    n = len(store.texts)
+
+    def stop(fraction, message):
+        if store.done >= 4:
+            raise Stop
+
+    with pytest.raises(Stop):
+        store.embed_pending(client, batch=2, progress=stop)
+    assert store.done == 4
+
+    reopened = EmbeddingStore(path)  # as a new process would
+    assert reopened.done == 4 and reopened.pending == n - 4
+    handler.paths.clear()
+    assert reopened.embed_pending(client, batch=2) == n - 4
+    assert handler.paths == ["/api/embed"] * math.ceil((n - 4) / 2)
+    np.testing.assert_allclose(reopened.vectors, _expected(reopened.texts), atol=1e-6)
+
+
+def test_new_version_keeps_vectors_and_appends_new_texts(tmp_path, stub):
+    handler, client = stub
+    path = str(tmp_path)
+    old = EmbeddingStore.prepare(path, table(TEXTS), "m", "v1")
+    old.embed_pending(client)
+    old_texts, old_vectors = list(old.texts), np.array(old.vectors)
+
+    rows = table(TEXTS + NEW_TEXTS, n=80, seed=1)
+    store = EmbeddingStore.prepare(path, rows, "m", "v2")
+    assert store.texts[:len(old_texts)] == old_texts
+    assert sorted(store.texts[len(old_texts):]) == sorted(set(rows) - set(old_texts))
+    assert store.done == len(old_texts)
+    np.testing.assert_array_equal(store.vectors, old_vectors)
+    assert [store.texts[i] for i in store.rows] == rows.tolist()
+
+    handler.paths.clear()
+    assert store.embed_pending(client) == len(store.texts) - len(old_texts)
+    assert len(handler.paths) == 1
+    np.testing.assert_allclose(store.vectors, _expected(store.texts), atol=1e-6)
+
+
+def test_other_model_starts_over(tmp_path, stub):
+    _, client = stub
+    path = str(tmp_path)
+    EmbeddingStore.prepare(path, table(TEXTS), "m", "v1").embed_pending(client)
+    store = EmbeddingStore.prepare(path, table(TEXTS), "other", "v1")
+    assert store.meta["model"] == "other"
+    assert store.done == 0 and store.meta["dim"] is None and store.vectors is None
+    assert not os.path.exists(os.path.join(path, "vectors.bin"))
+
+
+def test_search_respects_rows_and_limit(tmp_path, stub):
+    _, client = stub
+    rows = table(TEXTS, n=200)
+    store = EmbeddingStore.prepare(str(tmp_path), rows, "m", "v1")
+    store.embed_pending(client)
+    q = store.embed_query(client, "robo a pasajero en el metro")
+
+    idxs, scores = store.search(q, 3)
+    assert rows[idxs[0]] == TEXTS[0] and idxs[0] == rows.tolist().index(TEXTS[0])
+    assert np.all(np.diff(scores) <= 0)
+    assert len(set(rows[idxs])) == len(idxs)  # one row per distinct text
+
+    allowed = np.flatnonzero(rows.str.contains("IZTA").to_numpy())
+    idxs, _ = store.search(q, 5, rows=allowed, limit=150)
+    assert len(idxs) and set(idxs) <= set(allowed[allowed < 150])
+
+    idxs, _ = store.search(q, 10, limit=5)
+    assert len(idxs) and np.all(idxs < 5)
+
+
+def test_legacy_embeddings_endpoint_fallback():
+    handler = make_handler(legacy_embed=True)
+    with serve(handler=handler) as url:
+        vectors = OllamaClient(url).embed("m", ["a b", "c"])
+    assert handler.paths == ["/api/embed", "/api/embeddings", "/api/embeddings"]
+    np.testing.assert_allclose(vectors, _expected(["a b", "c"]))
+
+
+def test_missing_model_is_not_mistaken_for_an_old_server():
+    handler = make_handler()
+    with serve(handler=handler) as url:
+        with pytest.raises(RuntimeError, match="not found"):
+            OllamaClient(url).embed("missing", ["a"])
+    assert handler.paths == ["/api/embed"]
+
+
+
+def test_store_path_depends_on_extract_model_and_columns():
+    cols = ["delito", "alcaldia_hecho"]
+    paths = {store_path(cols, "m", "a"), store_path(cols, "m", "b"), store_path(cols, "other", "a"),
+             store_path(cols[:1], "m", "a")}
+    assert len(paths) == 4
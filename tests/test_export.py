@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from utils import export
+from utils.export import export_file, write_export
+
+
+def frame():
+    """The first rows hold only missing values, as in sparse crime columns."""
+    return pd.DataFrame({
+        "colonia": np.array([None] * 3 + ["ROMA NORTE", "CENTRO", None, "DOCTORES"], dtype=object),
+        "latitud": np.array([None] * 3 + [19.41, 19.43, 19.42, None], dtype=object),
+        "alcaldia": pd.Categorical(["CUAUHTEMOC"] * 7),
+        "anio": np.arange(2016, 2023),
+    })
+
+
+@pytest.mark.parametrize("fmt", ["CSV", "Parquet"])
+def test_chunks_agree_on_types_missing_in_the_first_chunk(tmp_path, fmt):
+    df, path = frame(), str(tmp_path / f"out.{fmt}")
+    rows = np.array([0, 1, 2, 3, 5, 6])
+    assert write_export(df, path, fmt, rows=rows, chunk_rows=3) == len(rows)
+    back = pd.read_csv(path) if fmt == "CSV" else pq.read_table(path).to_pandas()
+    assert back["colonia"].fillna("").tolist() == ["", "", "", "ROMA NORTE", "", "DOCTORES"]
+    np.testing.assert_allclose(back["latitud"].astype(float), [np.nan] * 3 + [19.41, 19.42, np.nan])
+    assert back["anio"].tolist() == df["anio"].iloc[rows].tolist()
+
+
+def test_failed_write_closes_the_writer(tmp_path, monkeypatch):
+    closed = []
+    close = pq.ParquetWriter.close
+    monkeypatch.setattr(pq.ParquetWriter, "close", lambda self: closed.append(self) or close(self))
+    df = frame()
+    df["anio"] = df["anio"].astype(object)
+    df.loc[5, "anio"] = "unknown"  # does not fit the inferred int64
+    with pytest.raises(pa.ArrowInvalid):
+        write_export(df, str(tmp_path / "out.parquet"), "Parquet", chunk_rows=3)
+    assert len(closed) == 1
+    assert pq.read_table(tmp_path / "out.parquet").num_rows == 3  # the chunk before the failure, with a footer
+
+
+def test_export_file_leaves_nothing_behind(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_DIR", str(tmp_path))
+    with export_file(frame(), "Parquet", columns=["colonia", "anio"]) as f:
+        assert os.listdir(tmp_path) == []
+        assert pq.read_table(f).column_names == ["colonia", "anio"]
@@ -0,0 +1,32 @@
+import threading
+
+from utils.jobs import JobExecutor
+
+
+def _blocking(gate: threading.Event):
+    def fn(job):
+        while not gate.wait(0.01):
+            job.report()
+        return "finished"
+    return fn
+
+
+def test_release_cancels_only_orphaned_jobs():
+    executor, gate = JobExecutor(max_workers=1), threading.Event()
+    job = executor.submit("k", _blocking(gate), owner="a")
+    executor.submit("k", _blocking(gate), owner="b")
+    executor.release(job, "a")
+    assert not job._cancel.is_set()  # "b" still waits for it
+    executor.release(job, "b")
+    assert job.wait(2) and job.status == "cancelled"
+
+
+def test_submit_after_release_never_joins_a_cancelled_job():
+    executor, gate = JobExecutor(max_workers=2), threading.Event()
+    old = executor.submit("k", _blocking(gate), owner="a")
+    executor.release(old, "a")
+    new = executor.submit("k", _blocking(gate), owner="b")
+    assert new is not old
+    assert old.wait(2) and old.status == "cancelled"
+    gate.set()
+    assert new.wait(2) and new.status == "done" and new.result == "finished"
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from utils import metrics
+from utils.metrics import _count_bytes
+
+
+class Msg:
+    def __init__(self, size):
+        self.size = size
+
+    def ByteSize(self):
+        return self.size
+
+
+def test_bytes_are_counted_through_the_hooked_queue(monkeypatch):
+    sent = []
+    ctx = SimpleNamespace(_enqueue=sent.append)
+    assert _count_bytes(ctx) and _count_bytes(ctx)  # wrapped once
+    monkeypatch.setattr(metrics._local, "record", {"bytes_sent": 0}, raising=False)
+    ctx._enqueue(Msg(10))
+    ctx._enqueue(Msg(5))
+    assert metrics._local.record["bytes_sent"] == 15 and len(sent) == 2
+
+
+def test_missing_hook_reports_unknown_not_zero(monkeypatch):
+    import streamlit.runtime.scriptrunner as sr
+    monkeypatch.setattr(sr, "get_script_run_ctx", lambda: SimpleNamespace(session_id="s"))
+    assert not _count_bytes(SimpleNamespace())
+    metrics.begin_rerun("page")
+    try:
+        assert metrics._local.record["bytes_sent"] is None
+    finally:
+        metrics._local.record = None
@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from utils.metro import haversine_m, station_index
+
+
+def write_catalogue(path, n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pd.DataFrame({
+        "estacion": [f"S{i}" for i in range(n)], "lineas": ["1"] * n,
+        "latitud": 19.43 + rng.normal(0, 0.05, n), "longitud": -99.13 + rng.normal(0, 0.05, n),
+    }).to_csv(path, index=False)
+
+
+def test_nearest_matches_brute_force(tmp_path):
+    path = str(tmp_path / "stations.csv")
+    write_catalogue(path, 40)
+    index = station_index(path)
+    rng = np.random.default_rng(1)
+    lat, lon = 19.43 + rng.normal(0, 0.08, 500), -99.13 + rng.normal(0, 0.08, 500)
+    lat[3] = np.nan
+    idx, dist = index.nearest(lat, lon)
+    d = haversine_m(lat[:, None], lon[:, None], index.lat[None, :], index.lon[None, :])
+    ok = np.isfinite(lat)
+    assert np.array_equal(idx[ok], np.argmin(d[ok], axis=1))
+    np.testing.assert_allclose(dist[ok], d[ok].min(axis=1), rtol=1e-5)
+    assert idx[3] == -1 and np.isnan(dist[3])
+
+
+def test_station_index_follows_catalogue_edits(tmp_path):
+    path = str(tmp_path / "stations.csv")
+    write_catalogue(path, 5)
+    assert len(station_index(path).stations) == 5
+    write_catalogue(path, 7)
+    assert len(station_index(path).stations) == 7
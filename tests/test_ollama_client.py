@@ -0,0 +1,74 @@
+import pytest
+import requests
+
+from bench.ollama_stub import ANSWER, MODELS, make_handler, serve
+from ollama.client import OllamaClient, ollama_url, render_stream
+
+
+@pytest.mark.parametrize("host, url", [
+    ("", "http://localhost:11434"),
+    ("0.0.0.0", "http://localhost:11434"),
+    (":11434", "http://localhost:11434"),
+    ("gpu-box:8080", "http://gpu-box:8080"),
+    ("http://127.0.0.1:5555/", "http://127.0.0.1:5555"),
+    ("http://localhost", "http://localhost:11434"),
+    ("https://ollama.example.com/proxy", "https://ollama.example.com/proxy"),
+])
+def test_ollama_url_normalises_bind_addresses(host, url):
+    assert ollama_url(host) == url
+
+
+def test_stream_reassembles_answer():
+    with serve() as url:
+        client = OllamaClient(url)
+        tokens = list(client.generate_stream("m", "q"))
+    assert len(tokens) == len(ANSWER.split(" "))
+    assert "".join(tokens) == ANSWER
+
+
+def test_calls_reuse_one_pooled_connection():
+    handler = make_handler()
+    with serve(handler=handler) as url:
+        client = OllamaClient(url)
+        answers = ["".join(client.generate_stream("m", f"q{i}")) for i in range(3)]
+        client.embed("e", ["a", "b"])
+    assert answers == [ANSWER] * 3
+    assert handler.requests_seen == 4
+    assert handler.connections == 1
+
+
+def test_error_chunk_raises():
+    with serve(handler=make_handler(error="model crashed")) as url:
+        client = OllamaClient(url)
+        with pytest.raises(RuntimeError, match="model crashed"):
+            list(client.generate_stream("m", "q"))
+
+
+def test_stalled_stream_times_out():
+    with serve(handler=make_handler(answer="one two", delay=0.5)) as url:
+        client = OllamaClient(url, read_timeout=0.1, retries=0)
+        with pytest.raises(requests.exceptions.Timeout):
+            list(client.generate_stream("m", "q"))
+
+
+class Placeholder:
+    def __init__(self):
+        self.writes = []
+
+    def markdown(self, text):
+        self.writes.append(text)
+
+
+def test_render_stream_batches_writes():
+    tokens = ["ab"] * 100
+    placeholder = Placeholder()
+    text = render_stream(iter(tokens), placeholder, interval=60, max_chars=50)
+    assert text == "ab" * 100
+    assert len(placeholder.writes) == 5  # every 50 characters, then the final text
+    assert placeholder.writes[-1] == text
+    assert all(w.endswith("▌") for w in placeholder.writes[:-1])
+
+
+def test_models_lists_pulled_tags():
+    with serve() as url:
+        assert OllamaClient(url).models() == MODELS
@@ -0,0 +1,44 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils import raster
+from utils.raster import PointCloud, viewport
+
+
+def cloud(n: int = 5_000) -> PointCloud:
+    rng = np.random.default_rng(0)
+    return PointCloud(pd.DataFrame({
+        "latitud": 19.43 + rng.normal(0, 0.05, n), "longitud": -99.13 + rng.normal(0, 0.05, n),
+        "anio_hecho": rng.choice([2019, 2020], n), "categoria_delito": rng.choice(["A", "B"], n),
+    }))
+
+
+def test_rasterize_counts_every_point_in_view():
+    points = cloud()
+    counts = points.rasterize(viewport(19.43, -99.13, 9), 9, {"anio_hecho": None, "categoria_delito": None})
+    assert counts.sum() == len(points)
+    only = points.rasterize(viewport(19.43, -99.13, 9), 9, {"anio_hecho": [2020], "categoria_delito": None})
+    assert only.sum() == np.sum(np.array(points.labels["anio_hecho"])[points.codes["anio_hecho"]] == 2020)
+
+
+def test_pixel_counts_evicts_safely_across_threads(monkeypatch):
+    monkeypatch.setattr(raster, "MAX_ZOOM_LEVELS", 2)
+    points, errors = cloud(), []
+
+    def hammer(zoom):
+        try:
+            for _ in range(50):
+                px, py, n = points.pixel_counts(zoom, {})
+                assert n.sum() == len(points)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer, args=(z,)) for z in range(8, 16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(points._counts) <= 2
@@ -0,0 +1,16 @@
+from ollama import retriever
+from ollama.retriever import index_path, load_or_build
+
+A = ["ROBO A NEGOCIO | COYOACAN", "FRAUDE | TLALPAN"]
+B = ["AMENAZAS | IZTAPALAPA"]
+
+
+def test_extracts_keep_separate_indexes(tmp_path, monkeypatch):
+    monkeypatch.setattr(retriever, "INDEX_DIR", str(tmp_path))
+    cols = ["delito", "alcaldia_hecho"]
+    load_or_build(A, cols, "va", "extract-a")
+    load_or_build(B, cols, "vb", "extract-b")
+    assert index_path(cols, "extract-a") != index_path(cols, "extract-b")
+    index = load_or_build(A + ["EXTORSION | TLAHUAC"], cols, "va2", "extract-a")
+    assert index.n_docs == 3 and len(index.blocks) == 2  # appended to A's index, not rebuilt
+    assert load_or_build(B, cols, "vb", "extract-b").n_docs == 1
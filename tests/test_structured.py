@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from ollama.structured import answer_aggregate, parse_intent
+from utils.cube import CrimeCube
+
+
+@pytest.fixture(scope="module")
+def cube():
+    df = pd.DataFrame({
+        "fecha_hecho": pd.to_datetime(["2019-01-05 08:00", "2019-03-02 23:30", "2020-07-14 13:15",
+                                       "2020-07-20 02:00", "2020-11-01 23:10"]),
+        "anio_hecho": [2019, 2019, 2020, 2020, 2020],
+        "alcaldia_hecho": ["COYOACAN", "IZTAPALAPA", "IZTAPALAPA", "IZTAPALAPA", "TLALPAN"],
+        "categoria_delito": ["DELITO DE BAJO IMPACTO"] * 5,
+        "delito": ["FRAUDE", "ROBO A TRANSEUNTE EN VIA PUBLICA CON VIOLENCIA", "FRAUDE",
+                   "ROBO A TRANSEUNTE EN VIA PUBLICA CON VIOLENCIA", "AMENAZAS"],
+    })
+    return CrimeCube.build(df)
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Which alcaldía has the most crimes?", "**IZTAPALAPA** has the most records (3)"),
+    ("How many crimes are there in total?", "**5** records match (all records)"),
+    ("What is the latest hour a crime was recorded?", "latest hour of day with a recorded crime is **23:00**"),
+])
+def test_unfiltered_aggregates_use_the_whole_cube(cube, question, expected):
+    md, _ = answer_aggregate(question, cube)
+    assert expected in md
+
+
+def test_filters_narrow_the_answer(cube):
+    md, _ = answer_aggregate("How many robberies in 2020?", cube)
+    assert md.startswith("**1** records match")
+
+
+@pytest.mark.parametrize("question", [
+    "Tell me about a recent fraud",
+    "Which colonia has the most robberies?",
+])
+def test_non_aggregate_questions_go_to_the_llm(cube, question):
+    assert answer_aggregate(question, cube) is None
+    assert parse_intent(question) == (None, None)
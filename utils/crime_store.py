@@ -0,0 +1,317 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from utils.metrics import cache_resource
+
+# ---------- Locations ----------
+# FGJ_CSV / FGJ_PARQUET_DIR point the app at another extract (e.g. a synthetic one)
+CSV_PATH = os.environ.get("FGJ_CSV", "data/carpetasFGJ_sample.csv")
+PARQUET_DIR = os.environ.get("FGJ_PARQUET_DIR", "data/carpetasFGJ_parquet")
+SOURCE_FILE = "_source.json"
+
+# Column order of the FGJ "carpetas de investigación" export
+CRIME_COLUMNS = [
+    "anio_inicio", "mes_inicio", "fecha_inicio", "hora_inicio",
+    "anio_hecho", "mes_hecho", "fecha_hecho", "hora_hecho",
+    "delito", "categoria_delito", "competencia", "fiscalia", "agencia",
+    "unidad_investigacion", "colonia_hecho", "colonia_catalogo",
+    "alcaldia_hecho", "alcaldia_catalogo", "municipio_hecho",
+    "latitud", "longitud",
+]
+
+PARTITION_COLUMNS = ["anio_hecho", "alcaldia_hecho"]
+PARTITIONING = ds.partitioning(
+    pa.schema([("anio_hecho", pa.int16()), ("alcaldia_hecho", pa.string())]),
+    flavor="hive",
+)
+
+# Everything not listed here is read as text
+NUMERIC_TYPES = {
+    "anio_inicio": pa.float64(),
+    "anio_hecho": pa.float64(),
+    "latitud": pa.float64(),
+    "longitud": pa.float64(),
+}
+YEAR_COLUMNS = ["anio_inicio", "anio_hecho"]
+
+# Compact in-memory layout: date + hour strings become one datetime column
+DATETIME_COLUMNS = {"fecha_inicio": "hora_inicio", "fecha_hecho": "hora_hecho"}
+COORD_COLUMNS = ["latitud", "longitud"]
+
+
+# ---------- Ingestion (CSV -> partitioned Parquet) ----------
+def _source_signature(csv_path: str) -> dict:
+    st_ = os.stat(csv_path)
+    return {"path": os.path.abspath(csv_path), "size": st_.st_size, "mtime": st_.st_mtime}
+
+
+def _read_signature(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, SOURCE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_fresh(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> bool:
+    """True if `out_dir` holds a dataset ingested from the current `csv_path`."""
+    return _read_signature(out_dir) == _source_signature(csv_path)
+
+
+def _csv_batches(csv_path: str, block_size: int):
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        header = next(csv.reader(f))
+    column_types = {c: NUMERIC_TYPES.get(c, pa.string()) for c in header}
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(block_size=block_size),
+        # The FGJ exports quote multi-line values and are often cut mid-record
+        parse_options=pv.ParseOptions(newlines_in_values=True, invalid_row_handler=lambda row: "skip"),
+        convert_options=pv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    for batch in reader:
+        arrays, names = [], []
+        for name, col in zip(batch.schema.names, batch.columns):
+            if name in YEAR_COLUMNS:
+                col = pc.cast(col, pa.int16())
+            arrays.append(col)
+            names.append(name)
+        yield pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def ingest_csv(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR,
+               block_size: int = 64 << 20) -> str:
+    """
+    Streams `csv_path` into a Parquet dataset partitioned by
+    `anio_hecho`/`alcaldia_hecho` (hive layout). Memory use is bounded by
+    `block_size`, not by the file size. Returns `out_dir`.
+    """
+    batches = _csv_batches(csv_path, block_size)
+    first = next(batches, None)
+    if first is None:
+        raise ValueError(f"{csv_path} has no readable rows")
+
+    def _all():
+        yield first
+        yield from batches
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    ds.write_dataset(
+        _all(),
+        tmp_dir,
+        schema=first.schema,
+        format="parquet",
+        partitioning=PARTITIONING,
+        max_partitions=4096,
+        existing_data_behavior="delete_matching",
+    )
+    with open(os.path.join(tmp_dir, SOURCE_FILE), "w", encoding="utf-8") as f:
+        json.dump(_source_signature(csv_path), f)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    return out_dir
+
+
+def ensure_dataset(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> str:
+    """Ingests `csv_path` only if the Parquet copy is missing or stale."""
+    if not is_fresh(csv_path, out_dir):
+        ingest_csv(csv_path, out_dir)
+    return out_dir
+
+
+# ---------- Loading ----------
+def open_dataset(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> ds.Dataset:
+    ensure_dataset(csv_path, out_dir)
+    return ds.dataset(out_dir, format="parquet", partitioning=PARTITIONING,
+                      exclude_invalid_files=True)
+
+
+def dataset_version(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> str:
+    """Short hash of the ingested source; changes whenever the CSV is replaced."""
+    ensure_dataset(csv_path, out_dir)
+    sig = json.dumps(_read_signature(out_dir), sort_keys=True)
+    return hashlib.sha1(sig.encode("utf-8")).hexdigest()[:12]
+
+
+def source_id(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> str:
+    """
+    Short hash of which extract is open (CSV and Parquet locations). Unlike
+    `dataset_version` it stays the same when that extract grows, so derived
+    files that are appended to can be keyed on it.
+    """
+    where = json.dumps([os.path.abspath(csv_path), os.path.abspath(out_dir)])
+    return hashlib.sha1(where.encode("utf-8")).hexdigest()[:12]
+
+
+def build_filter(years=None, alcaldias=None):
+    """
+    Arrow filter expression on the partition keys, so the scanner skips
+    whole directories instead of reading and discarding rows.
+    """
+    expr = None
+    if years is not None:
+        expr = ds.field("anio_hecho").isin([int(y) for y in years])
+    if alcaldias is not None:
+        a = ds.field("alcaldia_hecho").isin(list(alcaldias))
+        expr = a if expr is None else expr & a
+    return expr
+
+
+def load_crimes(columns=None, years=None, alcaldias=None, limit=None,
+                csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> pd.DataFrame:
+    """
+    Reads only the requested `columns` from the partitions matching
+    `years` and `alcaldias` (None = all). `limit` stops the scan after
+    that many rows.
+    """
+    dataset = open_dataset(csv_path, out_dir)
+    cols = [c for c in (columns or CRIME_COLUMNS) if c in dataset.schema.names]
+    flt = build_filter(years, alcaldias)
+    if limit is not None:
+        table = dataset.head(int(limit), columns=cols, filter=flt)
+    else:
+        table = dataset.to_table(columns=cols, filter=flt)
+    return table.to_pandas()
+
+
+# ---------- Compact, shared, read-only frame ----------
+def _compact_table(table: pa.Table) -> pa.Table:
+    # Done in Arrow so the full-width Python strings are never materialized
+    names = table.schema.names
+    arrays, out_names = [], []
+    for name in names:
+        if name in DATETIME_COLUMNS.values():
+            continue
+        col = table[name]
+        if name in DATETIME_COLUMNS:
+            hora = table[DATETIME_COLUMNS[name]] if DATETIME_COLUMNS[name] in names else None
+            text = pc.binary_join_element_wise(col, pc.fill_null(hora, "00:00:00"), " ") if hora is not None \
+                else pc.binary_join_element_wise(col, "00:00:00", " ")
+            col = pc.strptime(text, format="%Y-%m-%d %H:%M:%S", unit="s", error_is_null=True)
+        elif name in COORD_COLUMNS:
+            col = pc.cast(col, pa.float32())
+        elif pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+            col = pc.dictionary_encode(col)
+        arrays.append(col)
+        out_names.append(name)
+    return pa.table(arrays, names=out_names)
+
+
+def _read_only(values):
+    if isinstance(values, pd.Categorical):
+        codes = np.array(values.codes)
+        codes.flags.writeable = False
+        return pd.Categorical.from_codes(codes, dtype=values.dtype)
+    if isinstance(values, pd.arrays.IntegerArray):
+        data = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+        mask = np.array(values.isna())
+        data.flags.writeable = mask.flags.writeable = False
+        return pd.arrays.IntegerArray(data, mask)
+    data = np.array(values)
+    data.flags.writeable = False
+    return data
+
+
+def freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rebuilds `df` on top of read-only buffers: in-place writes raise, while
+    filtered/derived frames stay free to modify their own copies.
+    """
+    return pd.DataFrame({c: _read_only(df[c].array) for c in df.columns}, index=df.index, copy=False)
+
+
+def load_compact_crimes(columns=None, years=None, alcaldias=None, limit=None,
+                        csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> pd.DataFrame:
+    """
+    Same selection as `load_crimes`, with compact dtypes: categoricals for
+    text, float32 coordinates, nullable Int16 years and real datetimes in
+    `fecha_inicio`/`fecha_hecho` (the `hora_*` columns are folded in).
+    """
+    dataset = open_dataset(csv_path, out_dir)
+    wanted = list(columns or CRIME_COLUMNS)
+    wanted += [DATETIME_COLUMNS[c] for c in wanted if c in DATETIME_COLUMNS]
+    cols = [c for c in CRIME_COLUMNS if c in wanted and c in dataset.schema.names]
+    flt = build_filter(years, alcaldias)
+    if limit is not None:
+        table = dataset.head(int(limit), columns=cols, filter=flt)
+    else:
+        table = dataset.to_table(columns=cols, filter=flt)
+    table = _compact_table(table)
+    df = table.to_pandas(types_mapper={pa.int16(): pd.Int16Dtype()}.get)
+    return freeze(df)
+
+
+@cache_resource(show_spinner="Loading crime data…", max_entries=4)
+def _shared_crimes(version: str, columns, csv_path: str, out_dir: str) -> pd.DataFrame:
+    df = load_compact_crimes(list(columns) if columns else None, csv_path=csv_path, out_dir=out_dir)
+    if "fecha_inicio" in df.columns:
+        # Filing order: a newer extract only adds rows at the end, which lets
+        # derived indexes append instead of rebuilding
+        df = freeze(df.sort_values("fecha_inicio", kind="stable", ignore_index=True))
+    return df
+
+
+def shared_crimes(columns=None, csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> pd.DataFrame:
+    """
+    One process-wide, read-only copy of the compact crime table, shared by
+    every session (no per-session pickling as with `st.cache_data`), in
+    `fecha_inicio` order. Reloaded automatically when the source CSV changes.
+    """
+    version = dataset_version(csv_path, out_dir)
+    return _shared_crimes(version, tuple(columns) if columns else None, csv_path, out_dir)
+
+
+def memory_report(csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR, nrows=None) -> pd.DataFrame:
+    """
+    Per-column deep memory (bytes) of a plain `pd.read_csv` frame versus the
+    compact frame, with a TOTAL row.
+    """
+    try:
+        raw = pd.read_csv(csv_path, nrows=nrows)
+    except pd.errors.ParserError:
+        raw = pd.read_csv(csv_path, nrows=nrows, engine="python", on_bad_lines="skip")
+    compact = load_compact_crimes(limit=nrows, csv_path=csv_path, out_dir=out_dir)
+    rep = pd.DataFrame({
+        "read_csv_dtype": raw.dtypes.astype(str),
+        "read_csv_bytes": raw.memory_usage(deep=True, index=False),
+    })
+    rep["compact_dtype"] = compact.dtypes.astype(str).reindex(rep.index).fillna("(folded into fecha_*)")
+    rep["compact_bytes"] = compact.memory_usage(deep=True, index=False).reindex(rep.index).fillna(0).astype("int64")
+    rep.loc["TOTAL"] = ["", rep["read_csv_bytes"].sum(), "", rep["compact_bytes"].sum()]
+    rep["ratio"] = (rep["read_csv_bytes"] / rep["compact_bytes"].replace(0, np.nan)).round(2)
+    return rep
+
+
+def partition_values(column: str, csv_path: str = CSV_PATH, out_dir: str = PARQUET_DIR) -> list:
+    """Distinct values of a partition column, read from the directory layout only."""
+    dataset = open_dataset(csv_path, out_dir)
+    values = set()
+    for frag in dataset.get_fragments():
+        keys = ds.get_partition_keys(frag.partition_expression)
+        if keys.get(column) is not None:
+            values.add(keys[column])
+    return sorted(values)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the FGJ CSV export into a partitioned Parquet dataset.")
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--out", default=PARQUET_DIR)
+    parser.add_argument("--report", action="store_true", help="print the read_csv vs compact memory report")
+    args = parser.parse_args()
+    out = ingest_csv(args.csv, args.out)
+    print(f"Wrote {out}")
+    if args.report:
+        print(memory_report(args.csv, args.out).to_string())
@@ -0,0 +1,128 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.crime_store import dataset_version, shared_crimes
+from utils.metrics import cache_resource
+
+DERIVED_DIR = "data/derived"
+
+# Finest grain; every rollup below is derived from it
+BASE = ("anio_hecho", "mes", "hora", "alcaldia_hecho", "categoria_delito", "delito")
+ROLLUPS = [
+    ("anio_hecho", "alcaldia_hecho", "categoria_delito"),
+    ("anio_hecho", "mes", "categoria_delito"),
+    ("anio_hecho", "hora", "categoria_delito"),
+    ("anio_hecho", "alcaldia_hecho", "delito"),
+    ("anio_hecho", "hora", "delito"),
+    ("anio_hecho", "mes", "hora", "alcaldia_hecho", "categoria_delito"),
+]
+MEASURES = {"n": "sum", "primero": "min", "ultimo": "max"}
+
+
+def base_cuboid(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Crime counts per year × month × hour × alcaldía × category × delito,
+    with the first/last `fecha_hecho` of each cell.
+    """
+    when = df["fecha_hecho"]
+    keys = pd.DataFrame({
+        "anio_hecho": df["anio_hecho"],
+        "mes": when.dt.month.astype("Int8"),
+        "hora": when.dt.hour.astype("Int8"),
+        "alcaldia_hecho": df["alcaldia_hecho"],
+        "categoria_delito": df["categoria_delito"],
+        "delito": df["delito"],
+        "fecha_hecho": when,
+    })
+    g = keys.groupby(list(BASE), observed=True, dropna=False)["fecha_hecho"]
+    out = pd.DataFrame({"n": g.size(), "primero": g.min(), "ultimo": g.max()})
+    return out.reset_index()
+
+
+def rollup(cuboid: pd.DataFrame, dims) -> pd.DataFrame:
+    g = cuboid.groupby(list(dims), observed=True, dropna=False)
+    return g.agg(MEASURES).reset_index()
+
+
+class CrimeCube:
+    """
+    Materialized count cube: the base cuboid plus a few rollups. Queries are
+    answered from the smallest cuboid that carries every dimension they
+    filter or group on, never from the raw table.
+    """
+
+    def __init__(self, cuboids: dict):
+        self.cuboids = cuboids
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "CrimeCube":
+        base = base_cuboid(df)
+        cuboids = {BASE: base}
+        for dims in ROLLUPS:
+            cuboids[dims] = rollup(base, dims)
+        return cls(cuboids)
+
+    def values(self, dim: str) -> list:
+        """Distinct non-null values of `dim`."""
+        for dims, c in sorted(self.cuboids.items(), key=lambda kv: len(kv[1])):
+            if dim in dims:
+                return c[dim].dropna().unique().tolist()
+        raise KeyError(dim)
+
+    def _pick(self, dims) -> pd.DataFrame:
+        fitting = [c for d, c in self.cuboids.items() if set(dims) <= set(d)]
+        return min(fitting, key=len)
+
+    def query(self, filters=None, group_by=(), sort: bool = True) -> pd.DataFrame:
+        """
+        `filters` maps a dimension to the allowed values; `group_by` lists
+        the output dimensions. Returns `n`, `primero`, `ultimo` per group
+        (a single row when `group_by` is empty), largest `n` first.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if v is not None}
+        group_by = list(group_by)
+        c = self._pick(set(filters) | set(group_by))
+        mask = np.ones(len(c), dtype=bool)
+        for dim, allowed in filters.items():
+            mask &= c[dim].isin(list(allowed)).to_numpy()
+        sel = c.loc[mask]
+        if group_by:
+            out = sel.groupby(group_by, observed=True, dropna=False).agg(MEASURES).reset_index()
+        else:
+            out = pd.DataFrame({"n": [sel["n"].sum()], "primero": [sel["primero"].min()],
+                                "ultimo": [sel["ultimo"].max()]})
+        out = out[out["n"] > 0]
+        return out.sort_values("n", ascending=False, ignore_index=True) if sort else out
+
+    # ---------- Persistence ----------
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for dims, c in self.cuboids.items():
+            c.to_parquet(os.path.join(path, "__".join(dims) + ".parquet"))
+
+    @classmethod
+    def load(cls, path: str):
+        cuboids = {}
+        for dims in [BASE, *ROLLUPS]:
+            f = os.path.join(path, "__".join(dims) + ".parquet")
+            if not os.path.exists(f):
+                return None
+            cuboids[dims] = pd.read_parquet(f)
+        return cls(cuboids)
+
+
+@cache_resource(show_spinner="Building aggregate cube…", max_entries=2)
+def _crime_cube(version: str) -> CrimeCube:
+    path = os.path.join(DERIVED_DIR, f"cube_{version}")
+    cube = CrimeCube.load(path)
+    if cube is None:
+        cube = CrimeCube.build(shared_crimes())
+        cube.save(path)
+    return cube
+
+
+def crime_cube() -> CrimeCube:
+    """Process-wide cube, built once per dataset version and kept on disk."""
+    return _crime_cube(dataset_version())
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+import pyarrow.parquet as pq
+import streamlit as st
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "app_exports")
+CHUNK_ROWS = 100_000   # rows converted and written at a time
+KEEP_SECONDS = 3600    # files left by an interrupted export are removed after this
+FORMATS = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _positions(df: pd.DataFrame, columns=None):
+    return df.columns.get_indexer(list(columns) if columns is not None else list(df.columns))
+
+
+def export_schema(df: pd.DataFrame, columns=None) -> pa.Schema:
+    """
+    Arrow schema of `columns` over all of `df`, so every chunk is written
+    with the same types. Object columns are inferred from all their values;
+    one holding nothing but missing values is exported as strings.
+    """
+    pos = _positions(df, columns)
+    head = df.iloc[:0, pos]
+    schema = pa.Schema.from_pandas(head, preserve_index=False)
+    for i, p in enumerate(pos):
+        if pd.api.types.is_object_dtype(head.dtypes.iloc[i]):
+            t = pa.infer_type(df.iloc[:, p], from_pandas=True)
+            schema = schema.set(i, schema.field(i).with_type(pa.string() if pa.types.is_null(t) else t))
+    return schema
+
+
+def iter_chunks(df: pd.DataFrame, rows=None, columns=None, chunk_rows: int = CHUNK_ROWS, schema=None):
+    """
+    Arrow tables (of `schema`, default `export_schema`) of at most
+    `chunk_rows` of the selected `rows` (None = all) of `df`, only
+    `columns`. Only one chunk is ever copied out of `df`.
+    """
+    pos = _positions(df, columns)
+    schema = schema or export_schema(df, columns)
+    n = len(df) if rows is None else len(rows)
+    for start in range(0, n, chunk_rows):
+        sel = slice(start, start + chunk_rows) if rows is None else rows[start:start + chunk_rows]
+        yield pa.Table.from_pandas(df.iloc[sel, pos], schema=schema, preserve_index=False)
+
+
+def write_export(df: pd.DataFrame, path: str, fmt: str = "CSV", rows=None, columns=None,
+                 chunk_rows: int = CHUNK_ROWS) -> int:
+    """
+    Streams the selection to `path` as CSV or Parquet (one row group per
+    chunk), so memory stays at one chunk whatever the selection size.
+    Returns the number of rows written.
+    """
+    schema, written = export_schema(df, columns), 0
+    with open(path, "wb") as f:
+        writer = (pv.CSVWriter(f, schema) if fmt == "CSV"
+                  else pq.ParquetWriter(f, schema, compression="zstd"))
+        try:
+            for table in iter_chunks(df, rows, columns, chunk_rows, schema):
+                writer.write_table(table)
+                written += table.num_rows
+        finally:
+            writer.close()
+    return written
+
+
+def _sweep(now: float):
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > KEEP_SECONDS:
+                os.remove(path)
+        except OSError:
+            pass  # removed by another session meanwhile
+
+
+def export_file(df: pd.DataFrame, fmt: str = "CSV", rows=None, columns=None):
+    """
+    Writes the selection to a fresh file under `EXPORT_DIR` and returns it
+    opened for reading. The name is unlinked before returning, so the data
+    goes away as soon as Streamlit closes the handle.
+    """
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _sweep(time.time())
+    path = os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}.{FORMATS[fmt][0]}")
+    try:
+        write_export(df, path, fmt, rows, columns)
+        return open(path, "rb")
+    finally:
+        os.remove(path)
+
+
+def export_controls(df: pd.DataFrame, rows=None, default_columns=None, name: str = "export", key: str = "export"):
+    """
+    Column picker, format choice and a download button for the selected
+    `rows` of `df`. The file is only written when the button is clicked,
+    off the script thread, in chunks to a temporary file. It is never built
+    as a string, though Streamlit holds the finished file while it is
+    downloaded.
+    """
+    n = len(df) if rows is None else len(rows)
+    columns = st.multiselect("Columns to export", options=list(df.columns),
+                             default=list(default_columns or df.columns), key=f"{key}_columns")
+    c1, c2 = st.columns([1, 2])
+    fmt = c1.radio("Format", list(FORMATS), horizontal=True, key=f"{key}_format",
+                   help="Parquet keeps column types and is several times smaller than CSV.")
+    ext, mime = FORMATS[fmt]
+    c2.download_button(f"⬇️ Download {n:,} rows ({fmt})",
+                       data=lambda: export_file(df, fmt, rows, columns),
+                       file_name=f"{name}.{ext}", mime=mime, on_click="ignore",
+                       disabled=not columns or not n, key=f"{key}_download")
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from utils.crime_store import dataset_version, shared_crimes
+from utils.metrics import cache_resource
+
+# Categorical columns the crime dashboard and the chat retriever filter on;
+# `mes` and `hora` come from `fecha_hecho`
+CRIME_FACETS = ("anio_hecho", "mes", "hora", "alcaldia_hecho", "categoria_delito", "delito")
+
+
+def _readonly(a: np.ndarray) -> np.ndarray:
+    a.flags.writeable = False
+    return a
+
+
+class FacetIndex:
+    """
+    Inverted index over categorical columns: for every value, the sorted ids
+    of the rows holding it. A selection starts from the most selective facet
+    and only checks the other facets on those candidate rows, so its cost
+    follows the size of the answer rather than the size of the table.
+    """
+
+    def __init__(self, n: int, values: dict, codes: dict, order: dict, offsets: dict):
+        self.n = n
+        self.values = values    # column -> pd.Index of its values (position = code)
+        self.codes = codes      # column -> per-row code, -1 for missing
+        self.order = order      # column -> row ids grouped by code, ascending within a code
+        self.offsets = offsets  # column -> start of each code's run in `order`
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, columns) -> "FacetIndex":
+        n = len(df)
+        id_type = np.int32 if n < 2 ** 31 else np.int64
+        values, codes, order, offsets = {}, {}, {}, {}
+        for col in columns:
+            s = df[col]
+            if isinstance(s.dtype, pd.CategoricalDtype):
+                # Reuse the frame's own codes; unused categories just count 0
+                c, uniques = s.cat.codes.to_numpy(), s.cat.categories
+            else:
+                c, uniques = pd.factorize(s, sort=True, use_na_sentinel=True)
+            c = c.astype(np.int16 if len(uniques) < 2 ** 15 else np.int32, copy=False)
+            counts = np.bincount(c[c >= 0], minlength=len(uniques))
+            start = n - int(counts.sum())  # missing values (-1) sort first
+            values[col] = pd.Index(uniques)
+            codes[col] = _readonly(c)
+            order[col] = _readonly(np.argsort(c, kind="stable").astype(id_type, copy=False))
+            offsets[col] = _readonly(start + np.concatenate([[0], np.cumsum(counts)]))
+        return cls(n, values, codes, order, offsets)
+
+    # ---------- Lookups ----------
+    def _wanted(self, col: str, allowed) -> np.ndarray:
+        """Codes of the `allowed` values of `col` that occur in the index."""
+        pos = self.values[col].get_indexer(list(allowed))
+        return np.unique(pos[pos >= 0])
+
+    def value_rows(self, col: str, value) -> np.ndarray:
+        """Read-only view of the sorted ids of the rows where `col == value`."""
+        return self._runs(col, self._wanted(col, [value]))
+
+    def _runs(self, col: str, codes: np.ndarray) -> np.ndarray:
+        o = self.offsets[col]
+        if not len(codes):
+            return self.order[col][:0]
+        if len(codes) == 1:
+            return self.order[col][o[codes[0]]:o[codes[0] + 1]]  # a view, no copy
+        return np.sort(np.concatenate([self.order[col][o[c]:o[c + 1]] for c in codes]))
+
+    def rows(self, filters=None):
+        """
+        Sorted ids of the rows matching every filter (`column -> allowed
+        values`; None means unfiltered, an empty list matches nothing), or
+        None when nothing is filtered, i.e. every row.
+        """
+        active = {col: self._wanted(col, allowed) for col, allowed in (filters or {}).items() if allowed is not None}
+        if not active:
+            return None
+        sizes = {col: int(np.diff(self.offsets[col])[codes].sum()) for col, codes in active.items()}
+        first = min(sizes, key=sizes.get)
+        rows = self._runs(first, active[first])
+        for col, codes in active.items():
+            if col == first or not len(rows):
+                continue
+            lut = np.zeros(len(self.values[col]) + 1, dtype=bool)
+            lut[codes + 1] = True  # shifted by one so missing (-1) maps to False
+            rows = rows[lut[self.codes[col][rows] + 1]]
+        return rows
+
+    def mask(self, filters=None) -> np.ndarray:
+        out = np.zeros(self.n, dtype=bool)
+        rows = self.rows(filters)
+        out[slice(None) if rows is None else rows] = True
+        return out
+
+    def count(self, filters=None) -> int:
+        rows = self.rows(filters)
+        return self.n if rows is None else len(rows)
+
+    def counts(self, filters=None, columns=None) -> dict:
+        """
+        Faceted-search counts: for each column, the number of matching rows
+        per value when every *other* filter is applied, so the options of a
+        facet show what choosing them would add. Largest first, zeros kept.
+        """
+        filters = filters or {}
+        out = {}
+        for col in columns or self.values:
+            rows = self.rows({k: v for k, v in filters.items() if k != col})
+            if rows is None:
+                n = np.diff(self.offsets[col])
+            else:
+                n = np.bincount(self.codes[col][rows] + 1, minlength=len(self.values[col]) + 1)[1:]
+            out[col] = pd.Series(n, index=self.values[col], name=col).sort_values(ascending=False, kind="stable")
+        return out
+
+    def take(self, df: pd.DataFrame, rows, columns=None, limit: int = None) -> pd.DataFrame:
+        """The selected rows of `df` (the frame the index was built on), only `columns`."""
+        cols = list(columns) if columns is not None else list(df.columns)
+        if rows is None:
+            return df[cols] if limit is None else df[cols].iloc[:limit]
+        return df[cols].iloc[rows if limit is None else rows[:limit]]
+
+
+@cache_resource(show_spinner="Indexing crime filters…", max_entries=2)
+def _crime_facets(version: str) -> FacetIndex:
+    df = shared_crimes()
+    when = df["fecha_hecho"]
+    cols = {"mes": when.dt.month.astype("Int8"), "hora": when.dt.hour.astype("Int8")}
+    frame = pd.DataFrame({c: cols[c] if c in cols else df[c] for c in CRIME_FACETS}, copy=False)
+    return FacetIndex.build(frame, CRIME_FACETS)
+
+
+def crime_facets() -> FacetIndex:
+    """Process-wide facet index over `shared_crimes()`, rebuilt per dataset version."""
+    return _crime_facets(dataset_version())
@@ -0,0 +1,105 @@
+import io
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from utils.metrics import cache_data
+
+# matplotlib/seaborn/scipy are imported inside the renderers, so reruns that
+# hit the cache never load them
+
+KDE_MAX_POINTS = 20_000       # KDE is fitted on at most this many values
+PAIRPLOT_MAX_ROWS = 2_000     # pairplot draws n_cols² panels of every point
+BOXPLOT_MAX_FLIERS = 50_000   # above this many rows outlier markers are skipped
+DPI = 100
+
+# Figure colours matching utils.theme (auto keeps matplotlib's defaults)
+FIGURE_THEMES = {
+    "auto": {},
+    "light": {"figure.facecolor": "#F4E7C8", "axes.facecolor": "#EAD9B5", "savefig.facecolor": "#F4E7C8"},
+    "dark": {"figure.facecolor": "#3D2A00", "axes.facecolor": "#2A1F00", "savefig.facecolor": "#3D2A00",
+             "text.color": "#E6E9EF", "axes.labelcolor": "#E6E9EF", "axes.edgecolor": "#5C3B00",
+             "xtick.color": "#E6E9EF", "ytick.color": "#E6E9EF", "legend.labelcolor": "#E6E9EF"},
+}
+
+
+def sample(df: pd.DataFrame, max_rows: int, seed: int = 0):
+    """`(rows, note)`: a reproducible random sample of at most `max_rows`, and a caption if it was cut."""
+    if len(df) <= max_rows:
+        return df, None
+    return df.sample(max_rows, random_state=seed), f"Showing a random sample of {max_rows:,} of {len(df):,} rows."
+
+
+def to_png(fig) -> bytes:
+    """Renders `fig` to PNG bytes and closes it, so no figure outlives the call."""
+    import matplotlib.pyplot as plt
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+
+def _style(theme: str):
+    import matplotlib
+    return matplotlib.rc_context(FIGURE_THEMES.get(theme, {}))
+
+
+# `version` + `selection` identify the data, so the frame itself (`_df`) is
+# not hashed on every rerun
+@cache_data(show_spinner=False, max_entries=128)
+def histogram_png(version: str, selection: tuple, column: str, theme: str, _df: pd.DataFrame):
+    """Histogram of every value with a KDE curve (fitted on a sample when large)."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from scipy.stats import gaussian_kde
+    values = _df[column].dropna().to_numpy(dtype=np.float64)
+    kde_values, note = sample(pd.Series(values), KDE_MAX_POINTS)
+    if note:
+        note = f"Density curve fitted on a random sample of {KDE_MAX_POINTS:,} of {len(values):,} values."
+    with _style(theme):
+        fig, ax = plt.subplots(figsize=(10, 5))
+        _, edges, _ = ax.hist(values, bins=20, color=sns.color_palette()[0], alpha=0.6, edgecolor="white")
+        if len(np.unique(kde_values)) > 1:
+            xs = np.linspace(values.min(), values.max(), 200)
+            # Scaled to counts, as sns.histplot(kde=True) does
+            ax.plot(xs, gaussian_kde(kde_values.to_numpy())(xs) * len(values) * (edges[1] - edges[0]),
+                    color=sns.color_palette()[0])
+        ax.set_title(f'Distribution of {column}')
+        ax.set_xlabel(column)
+        ax.set_ylabel('Frequency')
+        return to_png(fig), note
+
+
+@cache_data(show_spinner=False, max_entries=128)
+def boxplot_png(version: str, selection: tuple, column: str, by: str, theme: str, _df: pd.DataFrame):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fliers = len(_df) <= BOXPLOT_MAX_FLIERS
+    note = None if fliers else f"Outlier markers hidden ({len(_df):,} rows)."
+    with _style(theme):
+        fig, ax = plt.subplots(figsize=(10, 5))
+        sns.boxplot(data=_df, x=by, y=column, showfliers=fliers, ax=ax)
+        ax.set_title(f'Boxplot of {column} by {by.capitalize()}')
+        ax.set_xlabel(by.capitalize())
+        ax.set_ylabel(column)
+        return to_png(fig), note
+
+
+@cache_data(show_spinner="Drawing pairplot…", max_entries=32)
+def pairplot_png(version: str, selection: tuple, hue: str, theme: str, _df: pd.DataFrame):
+    import seaborn as sns
+    rows, note = sample(_df.dropna(), PAIRPLOT_MAX_ROWS)
+    with _style(theme):
+        grid = sns.pairplot(rows, hue=hue)
+        return to_png(grid.figure), note
+
+
+def show(rendered):
+    """Displays a `(png, note)` pair from the renderers above."""
+    png, note = rendered
+    st.image(png)
+    if note:
+        st.caption(note)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+from utils.crime_store import dataset_version, shared_crimes
+from utils.metrics import cache_resource
+
+# Local equirectangular projection around the CDMX centre; distortion is
+# well under 1% across the metro area, plenty for map cells
+LAT0, LON0 = 19.43, -99.13
+M_PER_DEG_LAT = 110_574.0
+M_PER_DEG_LON = 111_320.0 * np.cos(np.radians(LAT0))
+
+# Detail level -> (cell size in metres, map zoom that suits it)
+LEVELS = {
+    "City": (2000, 9.5),
+    "Alcaldía": (1000, 10.5),
+    "Colonia": (500, 11.5),
+    "Block": (250, 12.5),
+}
+DIMENSIONS = ["anio_hecho", "categoria_delito"]
+MAX_CELLS = 5000
+
+
+def cell_index(lat, lon, cell_m: float):
+    """Integer (ix, iy) of the square cell containing each point."""
+    ix = np.floor((np.asarray(lon, dtype=np.float64) - LON0) * M_PER_DEG_LON / cell_m)
+    iy = np.floor((np.asarray(lat, dtype=np.float64) - LAT0) * M_PER_DEG_LAT / cell_m)
+    return ix, iy
+
+
+def cell_corner(ix, iy, cell_m: float):
+    """(lat, lon) of the south-west corner of each cell (GridCellLayer anchor)."""
+    lat = LAT0 + np.asarray(iy) * cell_m / M_PER_DEG_LAT
+    lon = LON0 + np.asarray(ix) * cell_m / M_PER_DEG_LON
+    return lat, lon
+
+
+def aggregate_cells(df: pd.DataFrame, cell_m: float, dims=DIMENSIONS) -> pd.DataFrame:
+    """
+    Crime counts per cell × `dims`: one row per non-empty combination with
+    columns `ix`, `iy`, *dims, `n`. Rows without coordinates are dropped.
+    """
+    lat = df["latitud"].to_numpy(np.float64, na_value=np.nan)
+    lon = df["longitud"].to_numpy(np.float64, na_value=np.nan)
+    ok = np.isfinite(lat) & np.isfinite(lon)
+    ix, iy = cell_index(lat[ok], lon[ok], cell_m)
+    keys = pd.DataFrame({"ix": ix.astype(np.int32), "iy": iy.astype(np.int32)})
+    for d in dims:
+        keys[d] = df[d].to_numpy()[ok]
+    agg = keys.groupby(["ix", "iy", *dims], observed=True, dropna=False).size()
+    return agg.rename("n").reset_index()
+
+
+def build_pyramid(df: pd.DataFrame, levels=LEVELS, dims=DIMENSIONS) -> dict:
+    """Pre-aggregated cells for every detail level: `{level: DataFrame}`."""
+    return {name: aggregate_cells(df, cell_m, dims) for name, (cell_m, _) in levels.items()}
+
+
+@cache_resource(show_spinner="Binning crime locations…", max_entries=2)
+def _pyramid(version: str) -> dict:
+    return build_pyramid(shared_crimes())
+
+
+def crime_pyramid() -> dict:
+    """Process-wide cell pyramid of the crime table, rebuilt per dataset version."""
+    return _pyramid(dataset_version())
+
+
+def cells_for_view(agg: pd.DataFrame, cell_m: float, years=None, categories=None,
+                   max_cells: int = MAX_CELLS) -> pd.DataFrame:
+    """
+    Collapses the pre-aggregated cells to one row per cell for the selected
+    `years` / `categories` (None = all) and returns the map payload:
+    `lat`, `lon` (south-west corner) and `n`. At most `max_cells` of the
+    densest cells are kept.
+    """
+    mask = np.ones(len(agg), dtype=bool)
+    if years is not None:
+        mask &= agg["anio_hecho"].isin(years).to_numpy()
+    if categories is not None:
+        mask &= agg["categoria_delito"].isin(categories).to_numpy()
+    cells = agg.loc[mask].groupby(["ix", "iy"], sort=False)["n"].sum().reset_index()
+    if len(cells) > max_cells:
+        cells = cells.nlargest(max_cells, "n")
+    lat, lon = cell_corner(cells["ix"].to_numpy(), cells["iy"].to_numpy(), cell_m)
+    return pd.DataFrame({"lat": lat, "lon": lon, "n": cells["n"].to_numpy()})
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import streamlit as st
+
+# Threads rather than processes: results must land in this process's
+# caches, and the heavy parts (NumPy, scikit-learn, Arrow) release the GIL
+JOB_WORKERS = int(os.environ.get("APP_JOB_WORKERS", min(4, os.cpu_count() or 1)))
+MAX_FINISHED = 64  # finished jobs kept for late pollers and the settings page
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at its next `report()` once it has been cancelled."""
+
+
+class Job:
+    """
+    One unit of background work. The function receives the job and calls
+    `job.report(progress, message)` now and then; that is also where a
+    cancellation takes effect.
+    """
+
+    def __init__(self, key, label: str):
+        self.key = key
+        self.label = label
+        self.status = "queued"  # queued | running | done | failed | cancelled
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.owners = set()
+        self.submitted_at = time.time()
+        self.started_at = self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    def report(self, progress: float = None, message: str = None):
+        if self._cancel.is_set():
+            raise JobCancelled(self.label)
+        if progress is not None:
+            self.progress = min(max(float(progress), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    @property
+    def done(self) -> bool:
+        return self._finished.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._finished.wait(timeout)
+
+    def _finish(self, status: str):
+        self.status = status
+        self.finished_at = time.time()
+        self._finished.set()
+
+
+class JobExecutor:
+    """
+    Process-wide pool for slow page work. Submitting a key that is already
+    queued, running or recently finished returns that job instead of
+    starting another, so concurrent sessions share one computation. A job
+    nobody waits for any more is cancelled.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, keep: int = MAX_FINISHED):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.jobs = OrderedDict()  # key -> Job, oldest first
+        self.keep = keep
+        self.lock = threading.Lock()
+
+    def submit(self, key, fn, *args, label: str = None, owner=None, **kwargs) -> Job:
+        """Runs `fn(job, *args, **kwargs)` in the pool, or joins the same `key` in flight."""
+        with self.lock:
+            job = self.jobs.get(key)
+            if job is None or job.status in ("failed", "cancelled") or job._cancel.is_set():
+                # Never join a job on its way out: it would stop for this owner too
+                job = Job(key, label or str(key))
+                self.jobs[key] = job
+                job.future = self.pool.submit(self._run, job, fn, args, kwargs)
+                self._trim()
+            self.jobs.move_to_end(key)
+            if owner is not None:
+                job.owners.add(owner)
+            return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        if job._cancel.is_set():
+            job._finish("cancelled")
+            return
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job._finish("done")
+        except JobCancelled:
+            job._finish("cancelled")
+        except Exception as e:
+            job.error = e
+            job._finish("failed")
+
+    def _trim(self):
+        finished = [k for k, j in self.jobs.items() if j.done]
+        for k in finished[:max(0, len(finished) - self.keep)]:
+            del self.jobs[k]
+
+    def cancel(self, job: Job):
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():  # never started
+            job._finish("cancelled")
+
+    def release(self, job: Job, owner):
+        """`owner` no longer needs `job`; it is cancelled if no one else does."""
+        with self.lock:
+            # Decided and applied under the lock, so no `submit` can join in between
+            job.owners.discard(owner)
+            if not job.owners and not job.done:
+                self.cancel(job)
+
+    def snapshot(self) -> list:
+        now = time.time()
+        with self.lock:
+            jobs = list(self.jobs.values())
+        return [{
+            "job": j.label,
+            "status": j.status,
+            "progress": round(j.progress, 2),
+            "waiting sessions": len(j.owners),
+            "seconds": round((j.finished_at or now) - (j.started_at or now), 2),
+        } for j in reversed(jobs)]
+
+
+@st.cache_resource(show_spinner=False)
+def get_executor() -> JobExecutor:
+    return JobExecutor()
+
+
+def _session_id():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return getattr(ctx, "session_id", None) or "local"
+
+
+def run_job(slot: str, key, fn, *args, label: str = "Working…", poll: float = 0.25, **kwargs):
+    """
+    Runs `fn(job, *args, **kwargs)` on the shared executor and returns its
+    result, with a progress bar in place of the output meanwhile. `slot`
+    names the page output the job feeds: when this session moves on to
+    another key there (new inputs), its previous job is released and, with
+    no other session waiting for it, cancelled. A rerun that interrupts the
+    wait leaves the job running, so coming back picks it up again.
+    """
+    executor = get_executor()
+    owner = _session_id()
+    state_key = f"_job_{slot}"
+    previous = st.session_state.get(state_key)
+    if previous is not None and previous.key != key:
+        executor.release(previous, owner)
+    job = executor.submit(key, fn, *args, label=label, owner=owner, **kwargs)
+    st.session_state[state_key] = job
+
+    if not job.done:
+        bar = st.progress(job.progress, text=label)
+        while not job.wait(poll):
+            bar.progress(job.progress, text=f"{label} {job.message}".strip())
+        bar.empty()
+    if job.status == "failed":
+        raise job.error
+    if job.status == "cancelled":
+        st.warning(f"{label} was cancelled.")
+        st.stop()
+    return job.result
@@ -0,0 +1,198 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import streamlit as st
+
+try:
+    import psutil
+except ImportError:  # RSS is then reported from getrusage (peak, not current)
+    psutil = None
+
+LOG_PATH = os.environ.get("APP_METRICS_LOG", "data/derived/metrics/reruns.jsonl")
+LOG_MAX_BYTES = 20 * 1024 * 1024  # rotated to `<log>.1` beyond this
+MAX_RECORDS = 5000                # kept in memory for the metrics page
+
+# The rerun being measured in this script thread (Streamlit runs each
+# session's script in its own thread); None outside a rerun, e.g. in the
+# warm-up thread
+_local = threading.local()
+
+
+def rss_mb() -> float:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MetricsStore:
+    """Process-wide rerun records: a bounded in-memory window plus a JSONL log."""
+
+    def __init__(self, path: str = LOG_PATH, max_records: int = MAX_RECORDS):
+        self.path = path
+        self.records = deque(maxlen=max_records)
+        self.lock = threading.Lock()
+
+    def add(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.records.append(record)
+            if not self.path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > LOG_MAX_BYTES:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                pass  # metrics must never break a page
+
+    def snapshot(self) -> list:
+        with self.lock:
+            return list(self.records)
+
+    def to_jsonl(self) -> str:
+        return "".join(json.dumps(r, default=str) + "\n" for r in self.snapshot())
+
+    def clear(self):
+        with self.lock:
+            self.records.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def get_store() -> MetricsStore:
+    return MetricsStore()
+
+
+# ---------- Bytes sent to the browser ----------
+def _count_bytes(ctx) -> bool:
+    """
+    Wraps the session's message queue once so every delta is sized.
+    Returns False when there is nothing to wrap, so `bytes_sent` is unknown.
+    """
+    # Private Streamlit API, checked against Streamlit 1.65: the
+    # ScriptRunContext dataclass field `_enqueue` sends every ForwardMsg
+    enqueue = getattr(ctx, "_enqueue", None)
+    if enqueue is None:
+        return False
+    if getattr(enqueue, "_counted", False):
+        return True
+
+    def counted(msg):
+        rec = getattr(_local, "record", None)
+        if rec is not None:
+            try:
+                rec["bytes_sent"] = (rec["bytes_sent"] or 0) + msg.ByteSize()
+            except Exception:
+                pass
+        return enqueue(msg)
+
+    counted._counted = True
+    ctx._enqueue = counted
+    return True
+
+
+# ---------- Rerun lifecycle ----------
+def begin_rerun(page: str):
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    counting = ctx is not None and _count_bytes(ctx)
+    _local.record = {
+        "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "session": getattr(ctx, "session_id", None),
+        "page": page,
+        "sections": {},
+        "cache_hits": {},
+        "cache_misses": {},
+        "bytes_sent": 0 if counting else None,  # None: not measured
+    }
+    _local.start = time.perf_counter()
+
+
+def end_rerun():
+    rec = getattr(_local, "record", None)
+    if rec is None:
+        return
+    _local.record = None
+    rec["total_s"] = round(time.perf_counter() - _local.start, 4)
+    rec["rss_mb"] = round(rss_mb(), 1)
+    get_store().add(rec)
+
+
+@contextmanager
+def measure_rerun(page: str):
+    """Records one rerun of `page`, also when it ends with st.stop/st.rerun."""
+    begin_rerun(page)
+    try:
+        yield
+    finally:
+        end_rerun()
+
+
+def add_time(name: str, seconds: float):
+    """Adds `seconds` to the current rerun under `name`, for times measured elsewhere."""
+    rec = getattr(_local, "record", None)
+    if rec is not None:
+        rec["sections"][name] = round(rec["sections"].get(name, 0.0) + seconds, 4)
+
+
+@contextmanager
+def section(name: str):
+    """Adds the wall time of the block to the current rerun under `name` (load, filter, plot, …)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_time(name, time.perf_counter() - start)
+
+
+def _count(kind: str, name: str):
+    rec = getattr(_local, "record", None)
+    if rec is not None:
+        rec[kind][name] = rec[kind].get(name, 0) + 1
+
+
+# ---------- Cache hit/miss tracking ----------
+def _tracked(cache_decorator, **kwargs):
+    """
+    `st.cache_*` that also counts, per rerun, calls served from the cache
+    (hits) and calls that ran the function (misses).
+    """
+    def wrap(fn):
+        name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def body(*args, **kw):
+            _count("cache_misses", name)
+            return fn(*args, **kw)
+
+        cached = cache_decorator(**kwargs)(body)
+
+        @functools.wraps(fn)
+        def call(*args, **kw):
+            misses = (getattr(_local, "record", None) or {}).get("cache_misses", {}).get(name, 0)
+            result = cached(*args, **kw)
+            rec = getattr(_local, "record", None)
+            if rec is not None and rec["cache_misses"].get(name, 0) == misses:
+                _count("cache_hits", name)
+            return result
+
+        call.clear = cached.clear
+        return call
+    return wrap
+
+
+def cache_data(**kwargs):
+    """Drop-in for `st.cache_data(...)` with hit/miss counting."""
+    return _tracked(st.cache_data, **kwargs)
+
+
+def cache_resource(**kwargs):
+    """Drop-in for `st.cache_resource(...)` with hit/miss counting."""
+    return _tracked(st.cache_resource, **kwargs)
@@ -0,0 +1,130 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.crime_store import dataset_version, shared_crimes
+from utils.metrics import cache_data, cache_resource
+
+STATIONS_PATH = "data/metro_stations.csv"
+DERIVED_DIR = "data/derived"
+EARTH_RADIUS_M = 6_371_008.8
+
+
+# ---------- Geometry ----------
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres; all arguments broadcast as NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _unit_xyz(lat, lon):
+    # Euclidean order on the unit sphere == great-circle order, so a plain
+    # KD-tree gives exact nearest neighbours without a haversine metric
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+# ---------- Station catalogue ----------
+def load_stations(path: str = STATIONS_PATH) -> pd.DataFrame:
+    """Metro stations: `estacion`, `lineas` ("1/9"), `latitud`, `longitud`."""
+    return pd.read_csv(path, dtype={"lineas": str})
+
+
+class StationIndex:
+    """KD-tree over the station catalogue for batched nearest-station queries."""
+
+    def __init__(self, stations: pd.DataFrame):
+        from scipy.spatial import cKDTree
+        self.stations = stations.reset_index(drop=True)
+        self.lat = self.stations["latitud"].to_numpy(np.float64)
+        self.lon = self.stations["longitud"].to_numpy(np.float64)
+        self.tree = cKDTree(_unit_xyz(self.lat, self.lon))
+
+    def nearest(self, lat, lon, chunk_size: int = 1_000_000):
+        """
+        Returns `(station_idx, distance_m)` for every point. Rows with a
+        missing coordinate get index -1 and a NaN distance. Work is done in
+        chunks so temporary arrays stay bounded on very large inputs.
+        """
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        idx = np.full(lat.shape, -1, dtype=np.int32)
+        dist = np.full(lat.shape, np.nan, dtype=np.float32)
+        valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        for start in range(0, len(valid), chunk_size):
+            rows = valid[start:start + chunk_size]
+            _, near = self.tree.query(_unit_xyz(lat[rows], lon[rows]), k=1, workers=-1)
+            idx[rows] = near
+            dist[rows] = haversine_m(lat[rows], lon[rows], self.lat[near], self.lon[near])
+        return idx, dist
+
+
+def assign_nearest_station(df: pd.DataFrame, index: StationIndex) -> pd.DataFrame:
+    """
+    Derived columns for `df`, aligned on its index: `estacion_cercana`
+    (categorical, NaN when the row has no coordinates) and
+    `distancia_estacion_m` (float32).
+    """
+    idx, dist = index.nearest(df["latitud"].to_numpy(np.float64, na_value=np.nan),
+                              df["longitud"].to_numpy(np.float64, na_value=np.nan))
+    names = pd.Categorical.from_codes(idx, categories=index.stations["estacion"].astype(str))
+    return pd.DataFrame({"estacion_cercana": names, "distancia_estacion_m": dist}, index=df.index)
+
+
+# ---------- Cached derived column ----------
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+@cache_resource(show_spinner=False, max_entries=2)
+def _station_index(path: str, file_hash: str) -> StationIndex:
+    return StationIndex(load_stations(path))
+
+
+def station_index(path: str = STATIONS_PATH) -> StationIndex:
+    """KD-tree over the station catalogue at `path`, rebuilt when the file changes."""
+    return _station_index(path, _file_hash(path))
+
+
+@cache_resource(show_spinner="Assigning crimes to metro stations…", max_entries=2)
+def _nearest_stations(version: str, path: str, file_hash: str) -> pd.DataFrame:
+    cache_file = os.path.join(DERIVED_DIR, f"nearest_station_{version}-{file_hash}.parquet")
+    crimes = shared_crimes()
+    if os.path.exists(cache_file):
+        derived = pd.read_parquet(cache_file)
+        if len(derived) == len(crimes):
+            derived.index = crimes.index
+            return derived
+    derived = assign_nearest_station(crimes, _station_index(path, file_hash))
+    os.makedirs(DERIVED_DIR, exist_ok=True)
+    derived.reset_index(drop=True).to_parquet(cache_file)
+    return derived
+
+
+def nearest_stations(path: str = STATIONS_PATH) -> pd.DataFrame:
+    """
+    Nearest station + distance for every row of `shared_crimes()`, computed
+    once per (dataset version, station catalogue) and persisted under
+    `data/derived/` so restarts skip the computation.
+    """
+    return _nearest_stations(dataset_version(), path, _file_hash(path))
+
+
+@cache_data(show_spinner=False, max_entries=2)
+def _station_alcaldias(version: str, path: str, file_hash: str) -> pd.Series:
+    pairs = pd.DataFrame({"estacion": _nearest_stations(version, path, file_hash)["estacion_cercana"],
+                          "alcaldia": shared_crimes()["alcaldia_hecho"]}).dropna()
+    n = pairs.groupby(["estacion", "alcaldia"], observed=True).size().sort_values(ascending=False)
+    top = n.reset_index().drop_duplicates("estacion")
+    return pd.Series(top["alcaldia"].astype(str).to_numpy(), index=top["estacion"].astype(str).to_numpy())
+
+
+def station_alcaldias(path: str = STATIONS_PATH) -> pd.Series:
+    """Most frequent `alcaldia_hecho` among the crimes nearest each station, by station name."""
+    return _station_alcaldias(dataset_version(), path, _file_hash(path))
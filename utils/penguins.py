@@ -0,0 +1,44 @@
+import hashlib
+
+import pandas as pd
+
+from utils.metrics import cache_data
+
+FEATURES = ['bill_length_mm', 'bill_depth_mm', 'flipper_length_mm', 'body_mass_g']
+TARGET = 'species'
+
+
+@cache_data(show_spinner="Loading penguins…")
+def load_penguins() -> pd.DataFrame:
+    """
+    Palmer Penguins without missing values, downloaded once per process.
+    `st.cache_data` hands every caller its own copy, so pages can't change
+    each other's data.
+    """
+    import seaborn as sns
+    return sns.load_dataset("penguins").dropna()
+
+
+def species_options(df: pd.DataFrame) -> list:
+    return list(df[TARGET].unique())
+
+
+def numeric_columns(df: pd.DataFrame) -> list:
+    return list(df.select_dtypes(include=['float64']).columns)
+
+
+def filter_species(df: pd.DataFrame, species) -> pd.DataFrame:
+    """Rows of the selected species (a new frame; `df` is left untouched)."""
+    return df[df[TARGET].isin(list(species))]
+
+
+def features_target(df: pd.DataFrame):
+    """`(X, y)` for the species classifier, with rows aligned."""
+    rows = df.dropna(subset=FEATURES + [TARGET])
+    return rows[FEATURES], rows[TARGET]
+
+
+@cache_data(show_spinner=False)
+def penguins_version() -> str:
+    """Content hash of the loaded dataset, for keying rendered figures."""
+    return hashlib.sha1(pd.util.hash_pandas_object(load_penguins()).to_numpy().tobytes()).hexdigest()[:12]
@@ -0,0 +1,158 @@
+import base64
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from utils.crime_store import dataset_version, shared_crimes
+from utils.metrics import cache_data, cache_resource
+
+# deck.gl / Mapbox GL size the world as 512 px at zoom 0
+TILE = 512
+VIEW_W, VIEW_H = 1024, 640
+MAX_ZOOM_LEVELS = 32  # cached (zoom, filters) pixel tables per point cloud
+MAX_LAT = 85.05112878
+
+
+def mercator(lat, lon):
+    """Web Mercator world coordinates in [0, 1) (x east, y south)."""
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LAT, MAX_LAT)
+    x = (np.asarray(lon, dtype=np.float64) + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) / (2 * np.pi)
+    return x, y
+
+
+def inverse_mercator(x, y):
+    lon = np.asarray(x, dtype=np.float64) * 360.0 - 180.0
+    lat = np.degrees(2 * np.arctan(np.exp((0.5 - np.asarray(y, dtype=np.float64)) * 2 * np.pi)) - np.pi / 2)
+    return lat, lon
+
+
+def viewport(lat, lon, zoom: int, width: int = VIEW_W, height: int = VIEW_H):
+    """Pixel window `(x0, y0, width, height)` at `zoom` centred on (lat, lon)."""
+    cx, cy = mercator(lat, lon)
+    scale = TILE * 2 ** zoom
+    return int(cx * scale) - width // 2, int(cy * scale) - height // 2, width, height
+
+
+def viewport_bounds(window, zoom: int):
+    """`[west, south, east, north]` of a pixel window (BitmapLayer bounds)."""
+    x0, y0, w, h = window
+    scale = TILE * 2 ** zoom
+    north, west = inverse_mercator(x0 / scale, y0 / scale)
+    south, east = inverse_mercator((x0 + w) / scale, (y0 + h) / scale)
+    return [float(west), float(south), float(east), float(north)]
+
+
+class PointCloud:
+    """
+    Projected crime locations plus the filter columns as integer codes,
+    with per-zoom pixel counts cached as sparse `(px, py, n)` arrays.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        lat = df["latitud"].to_numpy(np.float64, na_value=np.nan)
+        lon = df["longitud"].to_numpy(np.float64, na_value=np.nan)
+        ok = np.isfinite(lat) & np.isfinite(lon)
+        self.x, self.y = mercator(lat[ok], lon[ok])
+        self.codes, self.labels = {}, {}
+        for col in ("anio_hecho", "categoria_delito"):
+            codes, uniques = pd.factorize(df[col].to_numpy()[ok], use_na_sentinel=True)
+            self.codes[col], self.labels[col] = codes.astype(np.int32), list(uniques)
+        self._counts = {}
+        self._lock = threading.Lock()  # shared by every session through cache_resource
+
+    def __len__(self):
+        return len(self.x)
+
+    def _mask(self, filters: dict):
+        mask = None
+        for col, values in filters.items():
+            if values is None:
+                continue
+            wanted = [i for i, v in enumerate(self.labels[col]) if v in set(values)]
+            m = np.isin(self.codes[col], wanted)
+            mask = m if mask is None else mask & m
+        return mask
+
+    def pixel_counts(self, zoom: int, filters: dict):
+        """Non-empty pixels at `zoom` as `(px, py, n)`; computed once per zoom + filters."""
+        key = (zoom, tuple(sorted((k, tuple(sorted(map(str, v)))) for k, v in filters.items() if v is not None)))
+        with self._lock:
+            counts = self._counts.get(key)
+        if counts is None:
+            # Binned outside the lock: sessions on other zooms are not held up
+            mask = self._mask(filters)
+            x, y = (self.x, self.y) if mask is None else (self.x[mask], self.y[mask])
+            scale = TILE * 2 ** zoom
+            px = np.floor(x * scale).astype(np.int64)
+            py = np.floor(y * scale).astype(np.int64)
+            cells, n = np.unique(px * scale + py, return_counts=True)
+            counts = (cells // scale, cells % scale, n)
+            with self._lock:
+                if key not in self._counts and len(self._counts) >= MAX_ZOOM_LEVELS:
+                    self._counts.pop(next(iter(self._counts)))
+                self._counts[key] = counts
+        return counts
+
+    def rasterize(self, window, zoom: int, filters: dict) -> np.ndarray:
+        """Counts per screen pixel (`height × width` array) for a viewport window."""
+        x0, y0, w, h = window
+        px, py, n = self.pixel_counts(zoom, filters)
+        inside = (px >= x0) & (px < x0 + w) & (py >= y0) & (py < y0 + h)
+        flat = (py[inside] - y0) * w + (px[inside] - x0)
+        return np.bincount(flat, weights=n[inside], minlength=w * h).reshape(h, w)
+
+
+def colorize(counts: np.ndarray, cmap: str = "inferno", spread: int = 1) -> np.ndarray:
+    """
+    RGBA image of `counts` on a log scale; empty pixels are transparent.
+    `spread` dilates each point to a (2·spread+1)² square so sparse
+    points stay visible at high zoom.
+    """
+    from matplotlib import colormaps
+    if spread:
+        padded = np.pad(counts, spread)
+        h, w = counts.shape
+        counts = np.max([padded[dy:dy + h, dx:dx + w] for dy in range(2 * spread + 1)
+                         for dx in range(2 * spread + 1)], axis=0)
+    level = np.log1p(counts)
+    top = level.max()
+    norm = level / top if top > 0 else level
+    rgba = colormaps[cmap](0.15 + 0.85 * norm, bytes=True)
+    rgba[..., 3] = np.where(counts > 0, (120 + 135 * norm).astype(np.uint8), 0)
+    return rgba
+
+
+def png_data_url(rgba: np.ndarray) -> str:
+    buf = io.BytesIO()
+    Image.fromarray(rgba, mode="RGBA").save(buf, format="PNG", compress_level=1)
+    return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+@cache_resource(show_spinner="Projecting crime locations…", max_entries=2)
+def _point_cloud(version: str) -> PointCloud:
+    return PointCloud(shared_crimes(columns=["latitud", "longitud", "anio_hecho", "categoria_delito"]))
+
+
+def crime_points() -> PointCloud:
+    """Process-wide projected point cloud of the crime table, rebuilt per dataset version."""
+    return _point_cloud(dataset_version())
+
+
+@cache_data(show_spinner=False, max_entries=64)
+def crime_overlay(version: str, lat: float, lon: float, zoom: int, years=None, categories=None,
+                  cmap: str = "inferno"):
+    """
+    One PNG overlay (as a data URL) for the viewport centred on (lat, lon)
+    at `zoom`, with its bounds and the number of crimes drawn. Its size is
+    the screen size whatever the number of records; cached per viewport,
+    zoom and filters.
+    """
+    points = _point_cloud(version)
+    window = viewport(lat, lon, zoom)
+    counts = points.rasterize(window, zoom, {"anio_hecho": years, "categoria_delito": categories})
+    spread = 1 if zoom >= 13 else 0
+    return png_data_url(colorize(counts, cmap, spread)), viewport_bounds(window, zoom), int(counts.sum())
@@ -0,0 +1,110 @@
+import importlib
+import os
+import threading
+import time
+
+import streamlit as st
+
+# Libraries the pages import lazily; loading them here moves the cost off
+# the first user's request
+HEAVY_MODULES = [
+    "matplotlib.pyplot", "seaborn", "scipy.spatial", "scipy.stats",
+    "sklearn.ensemble", "sklearn.linear_model", "sklearn.feature_extraction.text",
+    "plotly.express", "pydeck",
+]
+
+
+def _import_heavy():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+
+def _crime_table():
+    from utils.crime_store import shared_crimes
+    shared_crimes()
+
+
+def _cube():
+    from utils.cube import crime_cube
+    crime_cube()
+
+
+def _facets():
+    from utils.facets import crime_facets
+    crime_facets()
+
+
+def _map_cells():
+    from utils.geo_bins import crime_pyramid
+    crime_pyramid()
+
+
+def _stations():
+    from utils.metro import nearest_stations
+    nearest_stations()
+
+
+def _retriever():
+    # Same default column set as the chat page
+    from ollama.retriever import crime_retriever
+    from utils.crime_store import shared_crimes
+    crime_retriever(list(shared_crimes().columns[:3]))
+
+
+def _penguins():
+    from utils.penguins import load_penguins
+    load_penguins()
+
+
+# Run in order; later tasks reuse what earlier ones loaded
+TASKS = [
+    ("imports", _import_heavy),
+    ("crime table", _crime_table),
+    ("aggregate cube", _cube),
+    ("facet index", _facets),
+    ("map cells", _map_cells),
+    ("nearest stations", _stations),
+    ("chat retriever", _retriever),
+    ("penguins", _penguins),
+]
+
+
+class Warmup:
+    """Background preload of libraries, datasets and indexes; `status` is per task."""
+
+    def __init__(self, tasks=TASKS):
+        self.tasks = tasks
+        self.status = {name: "pending" for name, _ in tasks}
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+
+    def _run(self):
+        for name, task in self.tasks:
+            self.status[name] = "running"
+            start = time.perf_counter()
+            try:
+                task()
+                self.status[name] = f"{time.perf_counter() - start:.2f}s"
+            except Exception as e:  # a failed preload only means a slower first request
+                self.status[name] = f"failed: {e}"
+
+    @property
+    def done(self) -> bool:
+        return not self.thread.is_alive()
+
+
+@st.cache_resource(show_spinner=False)
+def _start() -> Warmup:
+    warmup = Warmup()
+    warmup.thread.start()
+    return warmup
+
+
+def start_warmup():
+    """
+    Starts the warm-up once per server process (the first script run) and
+    returns it. Set `APP_WARMUP=0` to disable; returns None then.
+    """
+    if os.environ.get("APP_WARMUP", "1") == "0":
+        return None
+    return _start()